@@ -1,4 +1,3 @@
-from sentence_transformers import SentenceTransformer
 import hdbscan
 import umap
 import numpy as np
@@ -8,6 +7,8 @@ import unidecode
 from rapidfuzz.distance import Levenshtein
 from nltk.stem.snowball import SnowballStemmer
 
+import cache_embeddings
+
 stemmer = SnowballStemmer("portuguese")
 
 verbos = [
@@ -151,8 +152,7 @@ verbos_norm = [v for v in verbos_norm if v.strip()]
 # ---------------------------------------------------------
 # 2. EMBEDDINGS (modelo melhor)
 # ---------------------------------------------------------
-modelo = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-emb = modelo.encode(verbos_norm)
+emb = cache_embeddings.codificar(verbos_norm, "sentence-transformers/all-mpnet-base-v2")
 
 # ---------------------------------------------------------
 # 3. REDUÇÃO DE RUÍDO (UMAP)
@@ -0,0 +1,336 @@
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import dados
+import medicao
+from dados import DIRETORIO_CACHE
+
+try:
+    import fcntl  # trava entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+DIRETORIO_BANCO = DIRETORIO_CACHE / "banco"
+
+# Configuração (sobrescrevível por variáveis de ambiente / .env)
+TABELA_PADRAO = os.getenv("MANUTENCAO_TABELA", "manutencao")
+COLUNA_ID = os.getenv("MANUTENCAO_COLUNA_ID", "idtarefa")
+TAMANHO_LOTE = int(os.getenv("MANUTENCAO_LOTE", "50000"))              # linhas por fetchmany
+INTERVALO_ATUALIZACAO = float(os.getenv("MANUTENCAO_INTERVALO", "60"))  # segundos entre consultas
+MAXIMO_PARTES = 32  # acima disso as partes Parquet são compactadas em uma
+
+_FONTE = None
+_TRAVA_FONTE = threading.Lock()
+
+
+# ------------------------------------------------------------
+# Conexão
+# ------------------------------------------------------------
+def conectar_mysql():
+    """Conexão MySQL com as credenciais MYSQL_* do ambiente (ou .env)."""
+    import mysql.connector
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return mysql.connector.connect(
+        host=os.getenv("MYSQL_HOST", "localhost"),
+        port=int(os.getenv("MYSQL_PORT", "3306")),
+        user=os.getenv("MYSQL_USER"),
+        password=os.getenv("MYSQL_PASSWORD"),
+        database=os.getenv("MYSQL_DATABASE"),
+    )
+
+
+def _identificador(nome):
+    if not re.fullmatch(r"\w+", nome):
+        raise ValueError(f"Identificador SQL inválido: {nome!r}")
+    return nome
+
+
+# ------------------------------------------------------------
+# Leitura em lotes direto para arrays colunares
+# ------------------------------------------------------------
+def lotes_colunares(cursor, tamanho_lote=TAMANHO_LOTE):
+    """
+    Consome um cursor já executado com fetchmany e devolve cada lote como
+    uma pyarrow.Table, sem passar por listas de dicionários ou CSV.
+    """
+    import pyarrow as pa
+
+    nomes = [d[0] for d in cursor.description]
+    while True:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            break
+        colunas = zip(*linhas)
+        yield pa.table([pa.array(c) for c in colunas], names=nomes)
+
+
+def ler_novas(conexao, tabela, coluna_id, desde=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Linhas com coluna_id > desde, em ordem crescente, em lotes de
+    tamanho_lote linhas (pyarrow.Table cada). O cursor padrão do
+    mysql-connector não é bufferizado: as linhas chegam do servidor
+    conforme o fetchmany, e só um lote fica em memória por vez.
+    """
+    tabela, coluna_id = _identificador(tabela), _identificador(coluna_id)
+    consulta = f"SELECT * FROM {tabela}"
+    if desde is not None:
+        consulta += f" WHERE {coluna_id} > {int(desde)}"
+    consulta += f" ORDER BY {coluna_id}"
+
+    cursor = conexao.cursor()
+    try:
+        cursor.execute(consulta)
+        yield from lotes_colunares(cursor, tamanho_lote)
+    finally:
+        cursor.close()
+
+
+def _no_esquema(lote, esquema):
+    """
+    O lote convertido para o esquema da parte aberta, ou None se não der:
+    uma coluna só com NULL até aqui (tipo null) que agora tem valores, ou
+    um tipo que não converte, exige uma parte nova.
+    """
+    import pyarrow as pa
+
+    if lote.schema.equals(esquema):
+        return lote
+    try:
+        return lote.cast(esquema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+
+
+# ------------------------------------------------------------
+# Cópia local incremental (Parquet particionado por atualização)
+# ------------------------------------------------------------
+class FonteBanco:
+    """
+    Mantém em .cache/banco/<tabela>/ uma cópia da tabela em partes
+    Parquet. Cada atualização busca só as linhas acima da marca d'água
+    (maior coluna_id já copiado) e as grava, lote a lote, numa parte nova.
+
+    `conectar` é qualquer função que devolva uma conexão DB-API, então a
+    mesma classe funciona com sqlite3 nos testes locais.
+    """
+
+    def __init__(self, conectar, tabela=TABELA_PADRAO, coluna_id=COLUNA_ID,
+                 diretorio=None, tamanho_lote=TAMANHO_LOTE):
+        self.conectar = conectar
+        self.tabela = tabela
+        self.coluna_id = coluna_id
+        self.tamanho_lote = tamanho_lote
+        self.diretorio = Path(diretorio or DIRETORIO_BANCO / tabela)
+        self._arquivo_meta = self.diretorio / "meta.json"
+        self._ultima_consulta = 0.0
+        self._trava = threading.Lock()
+
+    def meta(self):
+        if not self._arquivo_meta.exists():
+            return {"marca": None, "partes": []}
+        with open(self._arquivo_meta, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _gravar_meta(self, meta):
+        temporario = self._arquivo_meta.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporario, self._arquivo_meta)
+
+    @contextmanager
+    def _exclusivo(self):
+        """Trava a cópia local entre threads e entre workers (fcntl, se houver)."""
+        with self._trava:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.diretorio / "trava", "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _gravar_parquet(self, tabela, nome):
+        import pyarrow.parquet as pq
+
+        temporario = self.diretorio / f"{nome}.tmp"
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, self.diretorio / nome)
+
+    def _gravar_lotes(self, lotes, primeira):
+        """
+        Grava os lotes, à medida que chegam, em partes Parquet novas
+        (ParquetWriter num arquivo temporário; os.replace só depois do
+        último lote). Normalmente é uma parte só; quando um lote não cabe
+        no esquema da parte aberta, ela é fechada e outra começa, e a
+        leitura unifica os tipos. Retorna (nomes, linhas, maior coluna_id).
+        """
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        partes, escritor, linhas, marca = [], None, 0, None
+        try:
+            for lote in lotes:
+                if lote.num_rows == 0:
+                    continue
+                convertido = None if escritor is None else _no_esquema(lote, escritor.schema)
+                if convertido is None:
+                    if escritor is not None:
+                        escritor.close()
+                    # Nome único: nunca sobrescreve a parte de outro worker
+                    nome = f"parte-{primeira + len(partes):05d}-{uuid.uuid4().hex[:8]}.parquet"
+                    temporario = self.diretorio / f"{nome}.tmp"
+                    partes.append((temporario, nome))
+                    escritor = pq.ParquetWriter(temporario, lote.schema)
+                    convertido = lote
+                escritor.write_table(convertido)
+                linhas += lote.num_rows
+                maior = pc.max(lote[self.coluna_id]).as_py()
+                if maior is not None and (marca is None or maior > marca):
+                    marca = maior
+            if escritor is not None:
+                escritor.close()
+        except BaseException:
+            if escritor is not None:
+                escritor.close()
+            for temporario, _ in partes:
+                temporario.unlink(missing_ok=True)
+            raise
+
+        for temporario, nome in partes:
+            os.replace(temporario, self.diretorio / nome)
+        return [nome for _, nome in partes], linhas, marca
+
+    def atualizar(self):
+        """Copia as linhas novas; retorna quantas chegaram."""
+        # A meta é relida sob a trava: outro worker pode ter acabado de gravar
+        with self._exclusivo():
+            meta = self.meta()
+            conexao = self.conectar()
+            try:
+                with medicao.medir("Cópia das linhas novas"):
+                    lotes = ler_novas(conexao, self.tabela, self.coluna_id,
+                                      meta["marca"], self.tamanho_lote)
+                    nomes, linhas, marca = self._gravar_lotes(lotes, len(meta["partes"]))
+            finally:
+                conexao.close()
+            self._ultima_consulta = time.monotonic()
+
+            if not linhas:
+                return 0
+
+            meta = {"marca": marca, "partes": meta["partes"] + nomes}
+            antigas = []
+            if len(meta["partes"]) > MAXIMO_PARTES:
+                antigas = meta["partes"]
+                meta = self._compactar(meta)
+            self._gravar_meta(meta)
+            # Só depois da meta nova: leitores com a meta antiga ainda acham as partes
+            for parte in antigas:
+                (self.diretorio / parte).unlink(missing_ok=True)
+            return linhas
+
+    def _compactar(self, meta):
+        tabela = self._ler_tabela(meta)
+        nome = f"base-{meta['marca']}-{uuid.uuid4().hex[:8]}.parquet"
+        self._gravar_parquet(tabela, nome)
+        return {"marca": meta["marca"], "partes": [nome]}
+
+    def _ler_tabela(self, meta):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        partes = [pq.read_table(self.diretorio / p) for p in meta["partes"]]
+        return pa.concat_tables(partes, promote_options="default")
+
+    def ler(self):
+        """DataFrame com todas as linhas já copiadas (vazio se nenhuma)."""
+        import pandas as pd
+
+        with medicao.medir("Leitura do Parquet"):
+            for tentativa in range(3):
+                meta = self.meta()
+                if not meta["partes"]:
+                    return pd.DataFrame()
+                try:
+                    return dados.nulos_como_nan(self._ler_tabela(meta).to_pandas())
+                except FileNotFoundError:
+                    # Outro worker compactou as partes entre a meta e a leitura
+                    if tentativa == 2:
+                        raise
+
+    def carregar(self, intervalo=INTERVALO_ATUALIZACAO):
+        """
+        Atualiza (no máximo uma consulta a cada `intervalo` segundos) e
+        devolve o DataFrame pelo cache em memória compartilhado de dados.py,
+        que só relê o Parquet quando a marca d'água muda.
+
+        Se o banco estiver fora do ar, registra o erro e serve a cópia
+        local (a próxima tentativa só depois de `intervalo`); sem cópia
+        local, o erro sobe.
+        """
+        if time.monotonic() - self._ultima_consulta >= intervalo:
+            try:
+                self.atualizar()
+            except Exception:
+                self._ultima_consulta = time.monotonic()
+                if not self.meta()["partes"]:
+                    raise
+                log.exception("Falha ao atualizar %s; usando a cópia local", self.tabela)
+        meta = self.meta()
+        origem = ("banco", str(self.diretorio.resolve()))
+        return dados.memorizar(origem, (meta["marca"], tuple(meta["partes"])), self.ler)
+
+
+def _fonte_manutencao():
+    global _FONTE
+    with _TRAVA_FONTE:
+        if _FONTE is None:
+            _FONTE = FonteBanco(conectar_mysql)
+    return _FONTE
+
+
+def carregar_manutencao():
+    """Tabela de manutenção do MySQL configurado (usada por dados.carregar_saida)."""
+    return _fonte_manutencao().carregar()
+
+
+def versao_manutencao():
+    """Marca d'água e partes da cópia local: mudam a cada atualização com linhas novas."""
+    meta = _fonte_manutencao().meta()
+    return meta["marca"], tuple(meta["partes"])
+
+
+# ------------------------------------------------------------
+# Linha de comando: atualização fora do dashboard (ex.: cron)
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copia as linhas novas da tabela de manutenção")
+    parser.add_argument("--tabela", default=TABELA_PADRAO)
+    parser.add_argument("--sqlite", help="Usa um arquivo SQLite no lugar do MySQL")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        import sqlite3
+
+        conectar = lambda: sqlite3.connect(args.sqlite)
+    else:
+        conectar = conectar_mysql
+
+    fonte = FonteBanco(conectar, args.tabela)
+    n = fonte.atualizar()
+    print(f"{n} linhas novas; marca d'água = {fonte.meta()['marca']}")
@@ -0,0 +1,98 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from gerar_dados import gerar
+
+# ------------------------------------------------------------
+# Casos fixos: (sinônimos, texto, laço termo a termo, Normalizador)
+# ------------------------------------------------------------
+CASOS = [
+    # Termos sobrepostos: no laço vence a ordem do dicionário, no padrão
+    # único vence o casamento mais à esquerda e mais longo
+    ({"abc": "z", "c": "q", "ab c": "zz"}, "ab c bc", "ab q bc", "zz bc"),
+    # Base que contém outro termo: o padrão único não relê o que trocou
+    ({"trocar oleo": "substituir oleo", "oleo": "óleo"}, "trocar oleo", "substituir óleo", "substituir oleo"),
+    # Cadeia na ordem do dicionário é seguida pelos dois
+    ({"a": "b", "b": "c"}, "a b", "c c", "c c"),
+    # Cadeia fora de ordem: o laço já passou por B quando A vira B
+    ({"b": "c", "a": "b"}, "a b", "b c", "b c"),
+    # Ciclo
+    ({"a": "b", "b": "a"}, "a b", "a a", "a a"),
+]
+
+
+def _normalizadores(sinonimos, universal):
+    import normalizacao
+    from servico import normalizar_descricao
+
+    compilado = normalizacao.Normalizador(sinonimos, universal)
+    return (lambda t: normalizar_descricao(t, sinonimos, universal)), compilado
+
+
+def conferir_casos():
+    """Casos fixos em que o resultado de cada caminho não bate com o esperado."""
+    falhas = []
+    for sinonimos, texto, esperado_laco, esperado_compilado in CASOS:
+        laco, compilado = _normalizadores(sinonimos, {})
+        obtido = (laco(texto), compilado(texto))
+        if obtido != (esperado_laco, esperado_compilado):
+            falhas.append((sinonimos, texto, (esperado_laco, esperado_compilado), obtido))
+    return falhas
+
+
+def divergencias(sinonimos, universal, textos):
+    """(texto, laço, Normalizador) para cada texto em que os dois caminhos diferem."""
+    laco, compilado = _normalizadores(sinonimos, universal)
+    diferentes = []
+    for texto in textos:
+        a, b = laco(texto), compilado(texto)
+        if a != b:
+            diferentes.append((texto, a, b))
+    return diferentes
+
+
+def textos_do_projeto(linhas=20_000):
+    """Descrições sintéticas mais as de saida.csv, quando existir."""
+    textos = set(gerar(linhas)["DescricaoManutencao"].dropna())
+    saida = RAIZ / "saida.csv"
+    if saida.exists():
+        textos.update(pd.read_csv(saida, sep=";", usecols=["DescricaoManutencao"])["DescricaoManutencao"].dropna())
+    return sorted(textos)
+
+
+def conferir(linhas=20_000, mostrar=10):
+    """
+    Confere os casos fixos e, com dict_sinonimo.json / dict.json, que o
+    Normalizador dá o mesmo resultado que servico.normalizar_descricao.
+    Retorna True se tudo bate.
+    """
+    from servico import carregar_json_local, carregar_json_upper
+
+    ok = True
+    for sinonimos, texto, esperado, obtido in conferir_casos():
+        ok = False
+        print(f"caso {sinonimos!r} / {texto!r}: esperado {esperado!r}, obtido {obtido!r}")
+
+    sinonimos = carregar_json_local(RAIZ / "dicionarios" / "dict_sinonimo.json")
+    universal = carregar_json_upper(RAIZ / "dicionarios" / "dict.json")
+    textos = textos_do_projeto(linhas)
+    diferentes = divergencias(sinonimos, universal, textos)
+    print(f"{len(textos)} descrições, {len(diferentes)} divergências")
+    for texto, a, b in diferentes[:mostrar]:
+        print(f"  {texto!r}: laço {a!r}, Normalizador {b!r}")
+    return ok and not diferentes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Confere que a normalização compilada bate com a linha a linha"
+    )
+    parser.add_argument("--linhas", type=int, default=20_000, help="Linhas sintéticas geradas")
+    args = parser.parse_args()
+    sys.exit(0 if conferir(args.linhas) else 1)
@@ -0,0 +1,200 @@
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+sys.path.insert(0, str(RAIZ / "openai"))
+
+from gerar_dados import gerar
+
+ARQUIVO_RESULTADOS = Path(__file__).resolve().parent / "resultados.jsonl"
+
+
+# ------------------------------------------------------------
+# Etapas medidas (cada uma recebe o DataFrame sintético)
+# ------------------------------------------------------------
+def _dicionarios():
+    from servico import carregar_json_local, carregar_json_upper
+
+    return (
+        carregar_json_local(RAIZ / "dicionarios" / "dict_sinonimo.json"),
+        carregar_json_upper(RAIZ / "dicionarios" / "dict.json"),
+    )
+
+
+def _unicas(df, max_unicas):
+    unicas = sorted(df["DescricaoManutencao"].unique())
+    return unicas[:max_unicas]
+
+
+def etapa_normalizar_linha(df, max_unicas):
+    from servico import normalizar_descricao
+
+    sinonimos, universal = _dicionarios()
+    df["DescricaoManutencao"].map(lambda t: normalizar_descricao(t, sinonimos, universal))
+
+
+def etapa_normalizar_serie(df, max_unicas):
+    import normalizacao
+
+    sinonimos, universal = _dicionarios()
+    normalizacao.Normalizador(sinonimos, universal).normalizar_serie(df["DescricaoManutencao"])
+
+
+def etapa_levenshtein_sinonimos(df, max_unicas):
+    import similaridade
+    from sinonimos import get_key
+
+    descricoes = _unicas(df, max_unicas)
+    similaridade.agrupar_guloso(similaridade.limpar_lote([get_key(p) for p in descricoes]), 2)
+
+
+def etapa_levenshtein_divergencias(df, max_unicas):
+    import indice_metrico
+    import similaridade
+    from divergencias import calcular_fim_bloco
+
+    descricoes = _unicas(df, max_unicas)
+    indice_metrico.agrupar_com_indice(
+        similaridade.limpar_lote(descricoes), 2, blocos=calcular_fim_bloco(descricoes)
+    )
+
+
+def etapa_agrupar_por_objeto(df, max_unicas):
+    from etapa4 import agrupar_por_objeto
+
+    por_verbo = defaultdict(list)
+    for frase in _unicas(df, max_unicas):
+        palavras = frase.split()
+        if palavras:
+            por_verbo[palavras[0].lower()].append(frase)
+    agrupar_por_objeto(por_verbo)
+
+
+def etapa_embeddings_clusters(df, max_unicas):
+    import cache_embeddings
+    from clusters_incrementais import ModeloClusters
+
+    frases = _unicas(df, max_unicas)
+    emb = cache_embeddings.codificar(frases, "sentence-transformers/all-mpnet-base-v2")
+    ModeloClusters.ajustar(frases, emb)
+
+
+ETAPAS = {
+    "normalizar_linha": etapa_normalizar_linha,
+    "normalizar_serie": etapa_normalizar_serie,
+    "levenshtein_sinonimos": etapa_levenshtein_sinonimos,
+    "levenshtein_divergencias": etapa_levenshtein_divergencias,
+    "agrupar_por_objeto": etapa_agrupar_por_objeto,
+    "embeddings_clusters": etapa_embeddings_clusters,
+}
+# Etapas caras demais para rodar por padrão (modelo grande / download)
+OPCIONAIS = {"embeddings_clusters"}
+
+
+# ------------------------------------------------------------
+# Medição
+# ------------------------------------------------------------
+def medir(funcao, df, max_unicas, memoria=True):
+    """
+    Tempo de parede de uma execução sem tracemalloc e, se memoria=True,
+    pico de memória Python (MB) numa segunda execução com tracemalloc,
+    para que o custo do rastreamento não entre no tempo.
+    """
+    gc.collect()
+    inicio = time.perf_counter()
+    funcao(df, max_unicas)
+    segundos = time.perf_counter() - inicio
+
+    pico_mb = None
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao(df, max_unicas)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        pico_mb = pico / 2**20
+    return segundos, pico_mb
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(tamanhos, etapas, max_unicas=20000, memoria=True, saida=ARQUIVO_RESULTADOS):
+    """Roda cada etapa em cada tamanho e anexa uma linha JSON por medição."""
+    base = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "maquina": platform.node(),
+    }
+
+    with open(saida, "a", encoding="utf-8") as f:
+        for tamanho in tamanhos:
+            df = gerar(tamanho)
+            unicas = df["DescricaoManutencao"].nunique()
+            for nome in etapas:
+                segundos, pico_mb = medir(ETAPAS[nome], df, max_unicas, memoria)
+                linha = dict(
+                    base,
+                    etapa=nome,
+                    linhas=tamanho,
+                    unicas=min(unicas, max_unicas),
+                    segundos=round(segundos, 4),
+                    pico_mb=None if pico_mb is None else round(pico_mb, 2),
+                )
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+                f.flush()
+                print(f"{nome:>26}  {tamanho:>9}  {segundos:>9.3f}s  "
+                      f"{'-' if pico_mb is None else f'{pico_mb:.1f} MB':>10}")
+
+
+def _inteiros(texto):
+    return [int(x) for x in texto.split(",")]
+
+
+if __name__ == "__main__":
+    padrao = [e for e in ETAPAS if e not in OPCIONAIS]
+
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de normalização")
+    parser.add_argument("--tamanhos", type=_inteiros, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--etapas", type=lambda t: t.split(","), default=padrao,
+                        help=f"Separadas por vírgula. Disponíveis: {', '.join(ETAPAS)}")
+    parser.add_argument("--max-unicas", type=int, default=20000,
+                        help="Teto de descrições únicas nas etapas de agrupamento")
+    parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória")
+    parser.add_argument("--saida", type=Path, default=ARQUIVO_RESULTADOS)
+    parser.add_argument("--sem-conferencia", action="store_true",
+                        help="Não confere se as duas normalizações dão o mesmo resultado")
+    args = parser.parse_args()
+
+    desconhecidas = set(args.etapas) - set(ETAPAS)
+    if desconhecidas:
+        parser.error(f"etapas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+    # Só vale comparar os tempos se os dois caminhos dão o mesmo resultado
+    if not args.sem_conferencia and {"normalizar_linha", "normalizar_serie"} & set(args.etapas):
+        from conferir_normalizacao import conferir
+
+        if not conferir():
+            sys.exit("normalizar_linha e normalizar_serie divergem (benchmarks/conferir_normalizacao.py)")
+
+    executar(args.tamanhos, args.etapas, args.max_unicas, not args.sem_memoria, args.saida)
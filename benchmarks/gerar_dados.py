@@ -0,0 +1,123 @@
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+# ------------------------------------------------------------
+# Vocabulário no estilo de dict.txt / dicionario_final.json
+# ------------------------------------------------------------
+VERBOS = [
+    "AJUSTAR", "CALIBRAR", "COMPLETAR", "CONSERTAR", "LUBRIFICAR", "REGULAR",
+    "REVISAR", "SOLDAR", "SUBSTITUIR", "TROCAR", "VERIFICAR", "LIMPAR",
+]
+OBJETOS = [
+    "BANCO", "BATERIA", "BOMBA", "CABO", "CAMBIO", "CORREIA", "DESCARGA",
+    "EMBREAGEM", "ESCADA", "ESGUICHO", "FAROL", "FEIXE DE MOLA", "FILTRO DE AR",
+    "FILTRO DE ÓLEO", "FREIO", "LONA", "MAÇANETA", "MANGUEIRA", "MOTOR DE PARTIDA",
+    "ÓLEO", "PALHETA", "PNEU", "PORCA", "RADIADOR", "RETROVISOR", "TAMPA", "TRAVA",
+    "BARRA DE DIREÇÃO", "BARRA ESTABILIZADORA", "GÁS", "LANTERNA", "VIDRO",
+]
+TIPOS = [
+    "CA", "CB", "CC", "CG", "CM", "CP", "CR", "EH", "GA", "GG", "MB", "MN",
+    "PC", "PR", "RC", "RE", "TE", "TI", "TP", "TS", "VA", "VTR",
+]
+SEM_ACENTO = str.maketrans("ÁÂÃÀÉÊÍÓÔÕÚÇ", "AAAAEEIOOOUC")
+
+
+def frases_base():
+    """Frases canônicas: combinações verbo+objeto mais as do dicionário final."""
+    frases = {f"{v} {o}" for v in VERBOS for o in OBJETOS}
+    caminho = RAIZ / "dicionarios" / "dicionario_final.json"
+    if caminho.exists():
+        with open(caminho, "r", encoding="utf-8") as f:
+            dicionario = json.load(f)
+        frases.update(dicionario)
+        frases.update(dicionario.values())
+    return sorted(frases)
+
+
+# ------------------------------------------------------------
+# Erros de digitação comuns nas ordens de manutenção
+# ------------------------------------------------------------
+def com_erro(frase, rng):
+    i = rng.randrange(len(frase))
+    tipo = rng.random()
+    if tipo < 0.20:    # letra trocada de lugar
+        if i < len(frase) - 1:
+            return frase[:i] + frase[i + 1] + frase[i] + frase[i + 2:]
+    elif tipo < 0.40:  # letra faltando
+        return frase[:i] + frase[i + 1:]
+    elif tipo < 0.55:  # letra duplicada
+        return frase[:i] + frase[i] + frase[i:]
+    elif tipo < 0.70:  # sem acento
+        return frase.translate(SEM_ACENTO)
+    elif tipo < 0.80:  # espaço duplo
+        return frase.replace(" ", "  ", 1)
+    elif tipo < 0.90:  # plural
+        return frase + "S"
+    else:              # caixa diferente
+        return frase.lower() if rng.random() < 0.5 else frase.capitalize()
+    return frase
+
+
+def variantes(n_unicas, semente=0):
+    """n_unicas descrições: as canônicas primeiro e, depois delas, versões com 1-2 erros."""
+    rng = random.Random(semente)
+    base = frases_base()
+    rng.shuffle(base)
+    vistas = dict.fromkeys(base[:n_unicas])
+    while len(vistas) < n_unicas:
+        frase = rng.choice(base)
+        for _ in range(rng.choice((1, 1, 2))):
+            frase = com_erro(frase, rng)
+        vistas.setdefault(frase)
+    return list(vistas)
+
+
+def gerar(n_linhas, fracao_unicas=0.05, semente=0):
+    """
+    DataFrame no formato de saida.csv (idtarefa, DescricaoManutencao,
+    tag_equipamento, DataEntrada). As descrições seguem uma distribuição
+    de Zipf, como nas ordens reais: poucas tarefas muito frequentes.
+    """
+    rng = np.random.default_rng(semente)
+    unicas = variantes(max(100, int(n_linhas * fracao_unicas)), semente)
+
+    pesos = 1.0 / np.arange(1, len(unicas) + 1)
+    pesos /= pesos.sum()
+    escolha = rng.choice(len(unicas), size=n_linhas, p=pesos)
+    descricoes = np.asarray(unicas, dtype=object)[escolha]
+
+    tipos = rng.choice(TIPOS, size=n_linhas)
+    numeros = rng.integers(1, 400, size=n_linhas)
+    tags = pd.Series(tipos).str.cat(pd.Series(numeros).astype(str).str.zfill(3), sep="-")
+
+    inicio = np.datetime64("2021-01-01")
+    datas = inicio + rng.integers(0, 5 * 365, size=n_linhas).astype("timedelta64[D]")
+
+    return pd.DataFrame({
+        "idtarefa": np.arange(1, n_linhas + 1),
+        "DescricaoManutencao": descricoes,
+        "tag_equipamento": tags,
+        "DataEntrada": pd.to_datetime(datas).strftime("%Y-%m-%d"),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético no formato de saida.csv")
+    parser.add_argument("linhas", type=int)
+    parser.add_argument("--saida", default="benchmarks/sintetico.csv")
+    parser.add_argument("--fracao-unicas", type=float, default=0.05)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    df = gerar(args.linhas, args.fracao_unicas, args.semente)
+    df.to_csv(args.saida, sep=";", index=False)
+    print(f"{len(df)} linhas, {df['DescricaoManutencao'].nunique()} descrições únicas -> {args.saida}")
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+import medicao
+from dados import DIRETORIO_CACHE
+
+try:
+    import fcntl  # trava entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+DIRETORIO_EMBEDDINGS = DIRETORIO_CACHE / "embeddings"
+
+_MODELOS = {}
+_ARMAZENS = {}
+_TRAVA = threading.Lock()
+
+
+# ------------------------------------------------------------
+# Chave de conteúdo
+# ------------------------------------------------------------
+def normalizar_frase(frase):
+    """Remove espaços extras; é a forma usada na chave do cache."""
+    return " ".join(str(frase).split())
+
+
+def chave_frase(modelo_nome, frase):
+    conteudo = f"{modelo_nome}\x1f{normalizar_frase(frase)}"
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def carregar_modelo(modelo_nome):
+    """Carrega o SentenceTransformer uma vez por processo (import tardio)."""
+    modelo = _MODELOS.get(modelo_nome)
+    if modelo is None:
+        from sentence_transformers import SentenceTransformer
+
+        modelo = _MODELOS[modelo_nome] = SentenceTransformer(modelo_nome)
+    return modelo
+
+
+# ------------------------------------------------------------
+# Armazém em disco: vetores float32 crus + uma chave por linha
+# ------------------------------------------------------------
+class ArmazemEmbeddings:
+    """
+    Vetores de um modelo guardados em 'vetores.f32' (lido via memmap) e
+    suas chaves em 'chaves.txt' (linha i <-> vetor i). Novas frases são
+    apenas anexadas ao final dos dois arquivos.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._arquivo_vetores = diretorio / "vetores.f32"
+        self._arquivo_chaves = diretorio / "chaves.txt"
+        self._arquivo_meta = diretorio / "meta.json"
+        self.dim = None
+        self.linhas = {}
+        self._mapa = None
+        self._carregar()
+
+    @contextmanager
+    def _exclusivo(self):
+        """Trava os arquivos entre processos (sem fcntl, só entre threads)."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.diretorio / "trava", "a") as trava:
+            fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _carregar(self):
+        if not self._arquivo_meta.exists():
+            return
+        with self._exclusivo():
+            self._reler()
+
+    def _reler(self):
+        """
+        Relê as chaves do disco (chamado com a trava). Uma gravação
+        interrompida pode deixar mais chaves do que vetores, um vetor pela
+        metade ou uma chave sem quebra de linha: os dois arquivos são
+        cortados no maior número de linhas completas em ambos, para que a
+        chave i continue sempre apontando para o vetor i.
+        """
+        if self.dim is None:
+            if not self._arquivo_meta.exists():
+                return
+            with open(self._arquivo_meta, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+        conteudo = self._arquivo_chaves.read_bytes() if self._arquivo_chaves.exists() else b""
+        chaves = conteudo[:conteudo.rfind(b"\n") + 1].decode("utf-8").split()
+        tamanho_vetor = 4 * self.dim
+        tamanho = self._arquivo_vetores.stat().st_size if self._arquivo_vetores.exists() else 0
+        total = min(len(chaves), tamanho // tamanho_vetor)
+
+        if tamanho != total * tamanho_vetor:
+            os.truncate(self._arquivo_vetores, total * tamanho_vetor)
+        if len(chaves) != total or not conteudo.endswith(b"\n") and conteudo:
+            chaves = chaves[:total]
+            with open(self._arquivo_chaves, "w", encoding="utf-8") as f:
+                f.write("".join(f"{c}\n" for c in chaves))
+
+        self.linhas = {c: i for i, c in enumerate(chaves)}
+
+    def _matriz(self):
+        total = len(self.linhas)
+        if self._mapa is None or self._mapa.shape[0] != total:
+            self._mapa = np.memmap(
+                self._arquivo_vetores, dtype=np.float32, mode="r", shape=(total, self.dim)
+            )
+        return self._mapa
+
+    def anexar(self, chaves, vetores):
+        vetores = np.ascontiguousarray(vetores, dtype=np.float32)
+
+        with self._exclusivo():
+            if self.dim is None and not self._arquivo_meta.exists():
+                self.dim = int(vetores.shape[1])
+                with open(self._arquivo_meta, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+
+            # Outro processo pode ter anexado (ou deixado lixo) desde a última leitura
+            self._reler()
+            novas = [i for i, c in enumerate(chaves) if c not in self.linhas]
+            if not novas:
+                return
+            chaves = [chaves[i] for i in novas]
+            vetores = vetores[novas]
+
+            # Vetores primeiro: chave sem vetor é descartada na próxima leitura
+            inicio = self._arquivo_vetores.stat().st_size // (4 * self.dim) if self._arquivo_vetores.exists() else 0
+            with open(self._arquivo_vetores, "ab") as f:
+                f.write(vetores.tobytes())
+            with open(self._arquivo_chaves, "a", encoding="utf-8") as f:
+                f.write("".join(f"{c}\n" for c in chaves))
+
+            for i, c in enumerate(chaves):
+                self.linhas[c] = inicio + i
+
+    def obter(self, chaves):
+        """
+        Vetores das chaves pedidas. Se elas ocupam linhas consecutivas no
+        arquivo, devolve uma fatia do memmap (sem cópia).
+        """
+        if not chaves:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+
+        linhas = np.fromiter((self.linhas[c] for c in chaves), dtype=np.int64, count=len(chaves))
+        matriz = self._matriz()
+        if len(linhas) and np.array_equal(linhas, np.arange(linhas[0], linhas[0] + len(linhas))):
+            return matriz[linhas[0]:linhas[0] + len(linhas)]
+        return matriz[linhas]
+
+
+def _armazem(modelo_nome, normalizar_embeddings):
+    nome = re.sub(r"[^A-Za-z0-9_.-]", "_", modelo_nome)
+    if normalizar_embeddings:
+        nome += "-normalizado"
+    armazem = _ARMAZENS.get(nome)
+    if armazem is None:
+        armazem = _ARMAZENS[nome] = ArmazemEmbeddings(DIRETORIO_EMBEDDINGS / nome)
+    return armazem
+
+
+# ------------------------------------------------------------
+# API principal
+# ------------------------------------------------------------
+def codificar(frases, modelo_nome, normalizar_embeddings=False, show_progress_bar=False):
+    """
+    Equivalente a SentenceTransformer(modelo_nome).encode(frases), mas só
+    codifica as frases que ainda não estão no cache em disco. O modelo nem
+    é carregado quando todas as frases já são conhecidas.
+    """
+    with _TRAVA:
+        armazem = _armazem(modelo_nome, normalizar_embeddings)
+        chaves = [chave_frase(modelo_nome, f) for f in frases]
+
+        novas = {}
+        for chave, frase in zip(chaves, frases):
+            if chave not in armazem.linhas and chave not in novas:
+                novas[chave] = normalizar_frase(frase)
+
+        if novas:
+            with medicao.medir("Carregamento do modelo"):
+                modelo = carregar_modelo(modelo_nome)
+            with medicao.medir("Codificação", frases=len(novas)):
+                vetores = modelo.encode(
+                    list(novas.values()),
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalizar_embeddings,
+                    show_progress_bar=show_progress_bar,
+                )
+            armazem.anexar(list(novas.keys()), vetores)
+
+        return armazem.obter(chaves)
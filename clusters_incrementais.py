@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+import medicao
+from dados import DIRETORIO_CACHE
+
+DIRETORIO_CLUSTERS = DIRETORIO_CACHE / "clusters"
+
+PARAMETROS_UMAP = dict(n_neighbors=15, min_dist=0.0, n_components=5, metric="cosine")
+PARAMETROS_HDBSCAN = dict(min_cluster_size=3, min_samples=1, metric="euclidean")
+
+# Deriva que dispara um reajuste completo
+LIMITE_NOVAS = 0.20   # frases fora do ajuste / frases do ajuste
+LIMITE_RUIDO = 0.50   # fração das frases atribuídas depois do ajuste que caiu em ruído
+MINIMO_RUIDO = 20     # só avalia o ruído com pelo menos tantas atribuições
+
+_MODELOS = {}
+_TRAVA = threading.Lock()
+
+
+# ------------------------------------------------------------
+# Modelo ajustado (UMAP + HDBSCAN) e as frases que ele já conhece
+# ------------------------------------------------------------
+class ModeloClusters:
+    """
+    Guarda o redutor UMAP e o HDBSCAN (com prediction_data) ajustados, o
+    conjunto de frases do ajuste e o rótulo de cada frase já vista, seja
+    do ajuste ou atribuída depois por transform/approximate_predict.
+    """
+
+    def __init__(self, redutor, clusterer, frases, rotulos):
+        self.redutor = redutor
+        self.clusterer = clusterer
+        self.ajustadas = set(frases)
+        self.rotulos = dict(zip(frases, (int(r) for r in rotulos)))
+
+    @classmethod
+    def ajustar(cls, frases, embeddings, parametros_umap=None, parametros_hdbscan=None):
+        import umap
+        import hdbscan
+
+        with medicao.medir("UMAP (ajuste)"):
+            redutor = umap.UMAP(**(parametros_umap or PARAMETROS_UMAP))
+            reduzido = redutor.fit_transform(embeddings)
+
+        with medicao.medir("HDBSCAN (ajuste)"):
+            clusterer = hdbscan.HDBSCAN(prediction_data=True, **(parametros_hdbscan or PARAMETROS_HDBSCAN))
+            rotulos = clusterer.fit_predict(reduzido)
+        return cls(redutor, clusterer, list(frases), rotulos)
+
+    def atribuir(self, frases, embeddings):
+        """Coloca frases novas nos clusters existentes, sem reajustar."""
+        import hdbscan
+
+        if not len(frases):
+            return
+        with medicao.medir("UMAP (transform)", frases=len(frases)):
+            reduzido = self.redutor.transform(embeddings)
+        with medicao.medir("HDBSCAN (approximate_predict)"):
+            rotulos, _ = hdbscan.approximate_predict(self.clusterer, reduzido)
+        for frase, rotulo in zip(frases, rotulos):
+            self.rotulos[frase] = int(rotulo)
+
+    def fracao_novas(self, frases):
+        fora = sum(1 for f in frases if f not in self.ajustadas)
+        return fora / max(len(self.ajustadas), 1)
+
+    def fracao_ruido_atribuidas(self):
+        atribuidas = [r for f, r in self.rotulos.items() if f not in self.ajustadas]
+        if len(atribuidas) < MINIMO_RUIDO:
+            return 0.0
+        return sum(1 for r in atribuidas if r == -1) / len(atribuidas)
+
+
+# ------------------------------------------------------------
+# Persistência
+# ------------------------------------------------------------
+def caminho_modelo(nome, modelo_embeddings, parametros_umap, parametros_hdbscan):
+    conteudo = json.dumps(
+        [modelo_embeddings, parametros_umap, parametros_hdbscan], sort_keys=True
+    )
+    sufixo = hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:12]
+    return DIRETORIO_CLUSTERS / f"{nome}-{sufixo}.joblib"
+
+
+def _carregar(caminho):
+    import joblib
+
+    modelo = _MODELOS.get(caminho)
+    if modelo is None and caminho.exists():
+        modelo = _MODELOS[caminho] = joblib.load(caminho)
+    return modelo
+
+
+def _salvar(caminho, modelo):
+    import joblib
+
+    DIRETORIO_CLUSTERS.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(".tmp")
+    joblib.dump(modelo, temporario)
+    os.replace(temporario, caminho)
+    _MODELOS[caminho] = modelo
+
+
+# ------------------------------------------------------------
+# API principal
+# ------------------------------------------------------------
+def agrupar(
+    frases,
+    embeddings,
+    nome,
+    modelo_embeddings,
+    forcar=False,
+    parametros_umap=None,
+    parametros_hdbscan=None,
+    limite_novas=LIMITE_NOVAS,
+    limite_ruido=LIMITE_RUIDO,
+):
+    """
+    Rótulos HDBSCAN para as frases (embeddings na mesma ordem). Reaproveita
+    o modelo salvo e só passa as frases desconhecidas por transform /
+    approximate_predict; reajusta tudo quando forcar=True, quando não há
+    modelo salvo ou quando a deriva passa de limite_novas / limite_ruido.
+
+    Retorna (rótulos, relatório) — o relatório diz se houve reajuste e por quê.
+    """
+    parametros_umap = parametros_umap or PARAMETROS_UMAP
+    parametros_hdbscan = parametros_hdbscan or PARAMETROS_HDBSCAN
+    caminho = caminho_modelo(nome, modelo_embeddings, parametros_umap, parametros_hdbscan)
+    frases = list(frases)
+
+    with _TRAVA:
+        modelo = None if forcar else _carregar(caminho)
+        relatorio = {"reajuste": False, "motivo": "", "novas": 0}
+
+        if modelo is None:
+            relatorio["motivo"] = "pedido pelo usuário" if forcar else "sem modelo salvo"
+        elif modelo.fracao_novas(frases) > limite_novas:
+            relatorio["motivo"] = f"{modelo.fracao_novas(frases):.0%} de frases novas"
+            modelo = None
+        else:
+            novas = [i for i, f in enumerate(frases) if f not in modelo.rotulos]
+            relatorio["novas"] = len(novas)
+            if novas:
+                modelo.atribuir([frases[i] for i in novas], np.asarray(embeddings)[novas])
+
+            ruido = modelo.fracao_ruido_atribuidas()
+            if ruido > limite_ruido:
+                relatorio["motivo"] = f"{ruido:.0%} das frases atribuídas caíram em ruído"
+                modelo = None
+            elif novas:
+                _salvar(caminho, modelo)
+
+        if modelo is None:
+            modelo = ModeloClusters.ajustar(frases, embeddings, parametros_umap, parametros_hdbscan)
+            relatorio["reajuste"] = True
+            relatorio["novas"] = 0
+            _salvar(caminho, modelo)
+
+        rotulos = np.array([modelo.rotulos[f] for f in frases], dtype=np.int64)
+        return rotulos, relatorio
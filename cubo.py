@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import dados
+import equipamentos
+import medicao
+from dados import DIRETORIO_CACHE
+
+DIRETORIO_CUBO = DIRETORIO_CACHE / "cubo"
+
+DIMENSOES = ["ano", "mes", "tipo", "veiculo", "DescricaoManutencao"]
+COLUNA_ID = "idtarefa"
+COLUNA_DATA = "DataEntrada"
+
+
+# ------------------------------------------------------------
+# Agregação das linhas brutas
+# ------------------------------------------------------------
+def agregar(df, col_data=COLUNA_DATA, formato=None):
+    """
+    Contagem de registros por (ano, mes, tipo, veiculo, DescricaoManutencao).
+    Linhas sem data válida (ou sem a coluna) ficam com ano/mes vazios,
+    mas continuam contando para as outras dimensões. `formato` é o da
+    data (dados.formato_datas); sem ele, é inferido de df.
+    """
+    if col_data in df.columns:
+        datas = dados.converter_datas(df[col_data], formato)
+        ano, mes = datas.dt.year, datas.dt.month
+    else:
+        ano = mes = pd.Series(np.nan, index=df.index)
+
+    if "tag_equipamento" in df.columns:
+        tipo, veiculo = equipamentos.separar_tags(df["tag_equipamento"])
+    else:
+        tipo = veiculo = pd.Series(np.nan, index=df.index, dtype=object)
+
+    linhas = pd.DataFrame({
+        "ano": ano,
+        "mes": mes,
+        "tipo": tipo,
+        "veiculo": veiculo,
+        "DescricaoManutencao": df["DescricaoManutencao"] if "DescricaoManutencao" in df.columns else np.nan,
+    })
+    return somar(linhas.assign(registros=1))
+
+
+def somar(celulas):
+    """Junta células repetidas (mesmas dimensões) somando os registros."""
+    cubo = celulas.groupby(DIMENSOES, dropna=False, sort=False)["registros"].sum().reset_index()
+    cubo["ano"] = cubo["ano"].astype("Float64")
+    cubo["mes"] = cubo["mes"].astype("Float64")
+    cubo["registros"] = cubo["registros"].astype("int64")
+    return cubo
+
+
+# ------------------------------------------------------------
+# Cubo persistido com marca d'água
+# ------------------------------------------------------------
+class Cubo:
+    """
+    Cubo guardado em .cache/cubo/<origem>.parquet junto com a marca
+    d'água (maior idtarefa já somado), o número de linhas somadas e uma
+    soma de verificação do conteúdo delas. Uma atualização agrega só as
+    linhas acima da marca; se as linhas antigas mudaram (editadas,
+    removidas ou inseridas abaixo da marca), o total ou a soma de
+    verificação não batem e o cubo é refeito.
+    """
+
+    def __init__(self, origem, col_data=COLUNA_DATA, coluna_id=COLUNA_ID):
+        self.col_data = col_data
+        self.coluna_id = coluna_id
+        chave = json.dumps([origem, col_data, coluna_id], ensure_ascii=False)
+        nome = hashlib.sha1(chave.encode("utf-8")).hexdigest()[:16]
+        self.arquivo = DIRETORIO_CUBO / f"cubo-{nome}.parquet"
+
+    def _ler(self):
+        if not self.arquivo.exists():
+            return None, {}
+        try:
+            import pyarrow.parquet as pq
+
+            tabela = pq.read_table(self.arquivo)
+            meta = json.loads((tabela.schema.metadata or {})[b"cubo"])
+            return dados.nulos_como_nan(tabela.to_pandas()), meta
+        except Exception:
+            return None, {}
+
+    def _gravar(self, cubo, meta):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            tabela = pa.Table.from_pandas(cubo, preserve_index=False)
+            metadados = dict(tabela.schema.metadata or {})
+            metadados[b"cubo"] = json.dumps(meta).encode("utf-8")
+            tabela = tabela.replace_schema_metadata(metadados)
+
+            DIRETORIO_CUBO.mkdir(parents=True, exist_ok=True)
+            temporario = self.arquivo.with_suffix(".tmp")
+            pq.write_table(tabela, temporario)
+            os.replace(temporario, self.arquivo)
+        except Exception:
+            pass
+
+    def _verificacao(self, df):
+        """
+        Soma (módulo 2**64) dos hashes das linhas nas colunas que entram no
+        cubo. Não depende da ordem das linhas, então a soma das linhas
+        antigas mais a das novas é a soma de todas.
+        """
+        colunas = [
+            c for c in (self.coluna_id, self.col_data, "tag_equipamento", "DescricaoManutencao")
+            if c in df.columns
+        ]
+        return int(pd.util.hash_pandas_object(df[colunas], index=False).sum())
+
+    def atualizar(self, df):
+        """Cubo em dia com df, somando só as linhas novas quando possível."""
+        with medicao.medir("Leitura do cubo"):
+            cubo, meta = self._ler()
+
+        ids = df[self.coluna_id] if self.coluna_id in df.columns else None
+        marca = meta.get("marca")
+        incremental = (
+            cubo is not None
+            and ids is not None
+            and marca is not None
+            and "formato" in meta
+            and int((ids <= marca).sum()) == meta.get("linhas")
+        )
+        if incremental:
+            with medicao.medir("Verificação das linhas antigas"):
+                incremental = self._verificacao(df[ids <= marca]) == meta.get("verificacao")
+
+        if incremental:
+            novas = df[ids > marca]
+            if novas.empty:
+                return cubo
+            formato, verificacao = meta["formato"], meta["verificacao"]
+        else:
+            cubo, novas, formato, verificacao = None, df, None, 0
+
+        # Linhas novas usam o formato de data já inferido para as antigas
+        if formato is None and self.col_data in novas.columns:
+            formato = dados.formato_datas(novas[self.col_data])
+
+        with medicao.medir("Agregação das linhas novas", linhas=len(novas)):
+            delta = agregar(novas, self.col_data, formato)
+            cubo = delta if cubo is None else somar(pd.concat([cubo, delta], ignore_index=True))
+
+        meta = {
+            "marca": int(ids.max()) if ids is not None and len(ids) else None,
+            "linhas": len(df),
+            "formato": formato,
+            "verificacao": (verificacao + self._verificacao(novas)) % 2**64,
+        }
+        self._gravar(cubo, meta)
+        return cubo
+
+
+def obter_cubo(carregar, origem, versao, col_data=COLUNA_DATA):
+    """
+    Cubo da fonte `origem` (ex.: caminho do CSV). Enquanto `versao` não
+    muda, o cubo vem do cache em memória e carregar() (que devolve as
+    linhas brutas) nem é chamado.
+    """
+    cubo = Cubo(origem, col_data)
+    return dados.memorizar(("cubo", str(cubo.arquivo)), versao, lambda: cubo.atualizar(carregar()))
+
+
+def obter_cubo_saida(col_data=COLUNA_DATA):
+    """Cubo dos dados padrão das páginas (saida.csv ou banco)."""
+    return obter_cubo(dados.carregar_saida, dados.origem_saida(), dados.versao_saida(), col_data)
+
+
+# ------------------------------------------------------------
+# Consultas usadas pelas páginas
+# ------------------------------------------------------------
+def contagens_mensais(cubo):
+    """(ano, mes, registros) só das células com data válida."""
+    validas = cubo.dropna(subset=["ano", "mes"])
+    contagens = validas.groupby(["ano", "mes"])["registros"].sum().reset_index()
+    contagens["ano"] = contagens["ano"].astype("int32")
+    contagens["mes"] = contagens["mes"].astype("int32")
+    return contagens
+
+
+def registros_por_descricao(cubo):
+    """
+    Series DescricaoManutencao -> registros. A normalização fica para
+    quem lê (normalizacao.NormalizacaoIncremental), para que mudar os
+    dicionários não exija refazer o cubo.
+    """
+    descricoes = cubo["DescricaoManutencao"].astype(str)
+    return cubo["registros"].groupby(descricoes).sum()
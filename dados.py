@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import threading
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import medicao
+
+CSV_PADRAO = "saida.csv"
+DIRETORIO_CACHE = Path(".cache")
+AMOSTRA_FORMATO = 50  # valores olhados para inferir o formato das datas
+
+# Cache em memória compartilhado por todas as páginas do dashboard.
+# Chave: (assinatura do arquivo, separador, encoding) -> DataFrame já parseado
+_CACHE = {}
+# Fontes que não são arquivos (ex.: banco.py): origem -> (versão, DataFrame)
+_ORIGENS = {}
+_TRAVA = threading.RLock()  # reentrante: carregar() de memorizar pode ler outro CSV
+
+
+# ------------------------------------------------------------
+# Identificação da versão do arquivo
+# ------------------------------------------------------------
+def assinatura_arquivo(caminho):
+    """
+    Retorna (caminho absoluto, mtime_ns, tamanho) do arquivo.
+    Qualquer alteração no CSV muda a assinatura e invalida o cache.
+    """
+    caminho = Path(caminho).resolve()
+    info = caminho.stat()
+    return str(caminho), info.st_mtime_ns, info.st_size
+
+
+# ------------------------------------------------------------
+# Sidecar Parquet (sobrevive a reinícios do processo)
+# ------------------------------------------------------------
+def _caminho_sidecar(assinatura, sep, encoding):
+    origem = f"{assinatura[0]}|{sep}|{encoding}"
+    nome = hashlib.sha1(origem.encode("utf-8")).hexdigest()[:16]
+    return DIRETORIO_CACHE / f"{Path(assinatura[0]).stem}-{nome}.parquet"
+
+
+def _ler_sidecar(arquivo, assinatura):
+    """Lê o Parquet se ele foi gerado a partir da mesma versão do CSV."""
+    if not arquivo.exists():
+        return None
+
+    try:
+        import pyarrow.parquet as pq
+
+        tabela = pq.read_table(arquivo)
+        meta = (tabela.schema.metadata or {}).get(b"origem")
+        if meta is None or json.loads(meta) != list(assinatura):
+            return None
+        df = tabela.to_pandas()
+    except Exception:
+        return None
+    return nulos_como_nan(df)
+
+
+def nulos_como_nan(df):
+    """O Arrow devolve None onde o read_csv devolveria NaN."""
+    colunas_texto = df.columns[df.dtypes == object]
+    if len(colunas_texto):
+        df[colunas_texto] = df[colunas_texto].fillna(np.nan)
+    return df
+
+
+def _gravar_sidecar(df, arquivo, assinatura):
+    """Grava o Parquet de forma atômica; falhas apenas desativam o sidecar."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(tabela.schema.metadata or {})
+        meta[b"origem"] = json.dumps(list(assinatura)).encode("utf-8")
+        tabela = tabela.replace_schema_metadata(meta)
+
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo.with_suffix(".tmp")
+        pq.write_table(tabela, temporario)
+        os.replace(temporario, arquivo)
+    except Exception:
+        pass
+
+
+# ------------------------------------------------------------
+# Datas
+# ------------------------------------------------------------
+def formato_datas(serie):
+    """
+    Formato (strftime) inferido das primeiras datas não nulas da série
+    (vale o primeiro valor reconhecido; lixo como "x" é pulado), ou
+    "mixed" (cada valor lido por si) se nenhum deles for reconhecido.
+    None se a série não tiver texto não nulo.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        return None
+    amostra = serie.dropna()
+    if amostra.empty:
+        return None
+    from pandas.tseries.api import guess_datetime_format
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        for valor in amostra.head(AMOSTRA_FORMATO):
+            formato = guess_datetime_format(str(valor))
+            if formato is not None:
+                return formato
+    return "mixed"
+
+
+def converter_datas(serie, formato=None):
+    """
+    pd.to_datetime com errors="coerce" e um formato fixo. Quem converte
+    a mesma coluna em partes (blocos, linhas novas) infere o formato uma
+    vez com formato_datas e o repassa, para que todas as partes sejam
+    lidas do mesmo jeito.
+    """
+    if formato is None:
+        formato = formato_datas(serie)
+    return pd.to_datetime(serie, format=formato, errors="coerce")
+
+
+# ------------------------------------------------------------
+# Carregamento principal
+# ------------------------------------------------------------
+def carregar_csv(caminho=CSV_PADRAO, sep=";", encoding="utf-8"):
+    """
+    Carrega o CSV uma única vez por versão do arquivo.
+
+    Reruns do Streamlit recebem uma visão rasa (sem cópia dos dados) do
+    DataFrame em cache. Atribuir colunas na visão não altera o original.
+    Levanta FileNotFoundError se o arquivo não existir.
+    """
+    assinatura = assinatura_arquivo(caminho)
+    chave = (assinatura, sep, encoding)
+
+    with _TRAVA:
+        df = _CACHE.get(chave)
+        if df is None:
+            sidecar = _caminho_sidecar(assinatura, sep, encoding)
+            with medicao.medir("Leitura do Parquet"):
+                df = _ler_sidecar(sidecar, assinatura)
+            if df is None:
+                with medicao.medir("Parse do CSV"):
+                    df = pd.read_csv(assinatura[0], sep=sep, encoding=encoding)
+                _gravar_sidecar(df, sidecar, assinatura)
+
+            # Descarta versões antigas do mesmo arquivo
+            for antiga in [c for c in _CACHE if c[0][0] == assinatura[0]]:
+                del _CACHE[antiga]
+            _CACHE[chave] = df
+
+    return df.copy(deep=False)
+
+
+def memorizar(origem, versao, carregar):
+    """
+    Mesmo cache em memória para fontes que não são arquivos: guarda um
+    DataFrame por origem e só chama carregar() quando a versão muda.
+    """
+    with _TRAVA:
+        atual = _ORIGENS.get(origem)
+        if atual is None or atual[0] != versao:
+            atual = _ORIGENS[origem] = (versao, carregar())
+    return atual[1].copy(deep=False)
+
+
+def usa_banco():
+    """DADOS_FONTE=mysql faz as páginas lerem direto do banco (banco.py)."""
+    return os.getenv("DADOS_FONTE", "csv").lower() == "mysql"
+
+
+def versao_saida():
+    """Identifica a versão atual dos dados de carregar_saida()."""
+    if usa_banco():
+        import banco
+
+        return banco.versao_manutencao()
+    return assinatura_arquivo(CSV_PADRAO)
+
+
+def origem_saida():
+    """Nome estável da fonte de carregar_saida() (chave de caches derivados)."""
+    if usa_banco():
+        import banco
+
+        return f"banco:{banco.TABELA_PADRAO}"
+    return str(Path(CSV_PADRAO).resolve())
+
+
+def carregar_saida():
+    """Dados de manutenção das páginas: tabela do banco ou o export 'saida.csv'."""
+    if usa_banco():
+        import banco
+
+        return banco.carregar_manutencao()
+    return carregar_csv(CSV_PADRAO, sep=";")
+
+
+def limpar_cache():
+    """Esvazia o cache em memória (o sidecar em disco é mantido)."""
+    with _TRAVA:
+        _CACHE.clear()
+        _ORIGENS.clear()
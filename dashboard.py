@@ -1,13 +1,57 @@
-import streamlit as st
+import importlib
+import time
+
+inicio_processo = time.perf_counter()
 
-# Importa os módulos (se estiverem na mesma pasta)
-import meses
-import servico
-import divergencias
-import tipo_equipamento
-import sinonimos
+import pandas as pd
+import streamlit as st
 
 import estado_global
+import medicao
+from dados import DIRETORIO_CACHE
+
+
+# Registro das páginas: nome no menu -> (módulo, cabeçalho)
+# Os módulos só são importados quando a página é escolhida, para que as
+# páginas leves não esperem o carregamento de torch/numba/umap.
+PAGINAS = {
+    "Meses": ("meses", "📅 Análise por Meses"),
+    "Serviço": ("servico", "🛠️ Análise de Serviços"),
+    "Divergências": ("divergencias", "🔍 Agrupamento de Divergências"),
+    "Veículos": ("tipo_equipamento", None),
+    "Sinônimos": ("sinonimos", "Agrupamento de sinônimos"),
+}
+
+
+def carregar_pagina(nome_modulo):
+    """Importa o módulo da página sob demanda (span próprio no painel)."""
+    with medicao.medir(f"Import de '{nome_modulo}'"):
+        return importlib.import_module(nome_modulo)
+
+
+def exibir_desempenho(coletor):
+    """Painel de spans da execução atual na barra lateral."""
+    with st.sidebar.expander("⚡ Performance"):
+        spans = coletor.ordenados()
+        if not spans:
+            st.write("Nenhum span registrado.")
+            return
+
+        tabela = pd.DataFrame({
+            "Etapa": ["\u2003" * s["nivel"] + s["span"].split(" / ")[-1] for s in spans],
+            "ms": [s["duracao_ms"] for s in spans],
+        })
+        st.dataframe(tabela, hide_index=True, use_container_width=True)
+
+        st.download_button(
+            "📥 Baixar spans (JSON lines)",
+            coletor.jsonl(),
+            file_name=f"spans-{coletor.id}.jsonl",
+            mime="application/jsonl",
+        )
+        if st.checkbox("Gravar spans em .cache/medicao.jsonl", key="medicao_gravar"):
+            DIRETORIO_CACHE.mkdir(exist_ok=True)
+            coletor.salvar_jsonl(DIRETORIO_CACHE / "medicao.jsonl")
 
 
 # Configuração inicial do dashboard
@@ -17,34 +61,27 @@ st.sidebar.title("📊 Navegação")
 
 pagina = st.sidebar.radio(
     "Escolha uma página:",
-    (
-        "Meses",
-        "Serviço",
-        "Divergências",
-        "Veículos",
-        "Sinônimos"
-    ),
+    tuple(PAGINAS),
     key="menu_principal"
 )
 
 
 st.title("📘 Dashboard Geral")
 
-# Chamadas de acordo com a página escolhida
-if pagina == "Meses":
-    st.header("📅 Análise por Meses")
-    meses.main()          # <-- ALTERE caso seu arquivo não tenha função main()
+# Chamada de acordo com a página escolhida
+nome_modulo, cabecalho = PAGINAS[pagina]
 
-elif pagina == "Serviço":
-    st.header("🛠️ Análise de Serviços")
-    servico.main()
+with medicao.execucao(f"dashboard:{nome_modulo}", inicio=inicio_processo) as coletor:
+    coletor.registrar(
+        "Inicialização do dashboard", time.perf_counter() - inicio_processo, inicio_processo
+    )
+    modulo = carregar_pagina(nome_modulo)
 
-elif pagina == "Divergências":
-    st.header("🔍 Agrupamento de Divergências")
-    divergencias.main()
+    if cabecalho:
+        st.header(cabecalho)
 
-elif pagina == "Veículos":
-    tipo_equipamento.main()
-elif pagina == "Sinônimos":
-    st.header("Agrupamento de sinônimos")
-    sinonimos.main()
\ No newline at end of file
+    try:
+        with medicao.medir(f"Renderização de '{pagina}'"):
+            modulo.main()
+    finally:
+        exibir_desempenho(coletor)
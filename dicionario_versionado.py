@@ -0,0 +1,259 @@
+import json
+import os
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from pathlib import Path
+
+import medicao
+from dados import DIRETORIO_CACHE, assinatura_arquivo
+
+try:
+    import fcntl  # trava entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+DIRETORIO_DICIONARIOS = DIRETORIO_CACHE / "dicionarios"
+
+# Registros no diário acima dos quais ele é compactado em um snapshot
+LIMITE_DIARIO = 2000
+
+_LOJAS = {}
+_TRAVA = threading.Lock()
+
+
+# ------------------------------------------------------------
+# Dicionário com diário de alterações
+# ------------------------------------------------------------
+class DicionarioVersionado:
+    """
+    Dicionário chave -> valor persistido em .cache/dicionarios/ como
+    um snapshot (<nome>.json, com a versão em que foi tirado) mais um
+    diário append-only (<nome>.jsonl) com um registro por alteração:
+
+        {"versao": 42, "chave": "TROCAR", "valor": "SUBSTITUIR"}
+        {"versao": 43, "chave": "XXXX", "removida": true}
+
+    Cada alteração incrementa a versão. Ler as novidades custa só o
+    trecho do diário ainda não lido; de tempos em tempos o diário é
+    compactado num snapshot novo (gravação atômica com os.replace).
+    """
+
+    def __init__(self, nome, diretorio=DIRETORIO_DICIONARIOS, limite_diario=LIMITE_DIARIO):
+        self.nome = nome
+        self.diretorio = Path(diretorio)
+        self.limite_diario = limite_diario
+        self.arquivo_snapshot = self.diretorio / f"{nome}.json"
+        self.arquivo_diario = self.diretorio / f"{nome}.jsonl"
+
+        self.versao = 0
+        self._dados = {}
+        self._base = 0            # versão do snapshot carregado
+        self._historico = []      # (versao, chave, valor) depois do snapshot
+        self._id_snapshot = None
+        self._id_diario = None
+        self._posicao = 0         # bytes do diário já aplicados
+        self._copia = None        # (versao, dict) devolvido por dados()
+        self._origens = {}        # arquivo JSON -> assinatura já sincronizada
+        self._trava = threading.RLock()
+
+    # --------------------------------------------------------
+    # Leitura
+    # --------------------------------------------------------
+    @staticmethod
+    def _identificar(arquivo):
+        try:
+            info = arquivo.stat()
+        except FileNotFoundError:
+            return None
+        return info.st_ino, info.st_mtime_ns, info.st_size
+
+    def _carregar_snapshot(self):
+        self._dados, self._base, self._historico = {}, 0, []
+        if self.arquivo_snapshot.exists():
+            with open(self.arquivo_snapshot, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._dados, self._base = snapshot["dados"], snapshot["versao"]
+        self.versao = self._base
+        self._id_snapshot = self._identificar(self.arquivo_snapshot)
+        self._id_diario, self._posicao = None, 0
+
+    def _aplicar(self, registro):
+        versao, chave = registro["versao"], registro["chave"]
+        if versao <= self.versao:
+            return  # já contido no snapshot ou já aplicado
+        if registro.get("removida"):
+            self._dados.pop(chave, None)
+            valor = None
+        else:
+            valor = self._dados[chave] = registro["valor"]
+        self._historico.append((versao, chave, valor))
+        self.versao = versao
+
+    def atualizar(self):
+        """Aplica o que outros processos gravaram desde a última leitura."""
+        with self._trava:
+            if self._identificar(self.arquivo_snapshot) != self._id_snapshot:
+                self._carregar_snapshot()
+
+            id_diario = self._identificar(self.arquivo_diario)
+            if id_diario is None:
+                return self.versao
+            if self._id_diario is not None and (
+                id_diario[0] != self._id_diario[0] or id_diario[2] < self._posicao
+            ):
+                self._posicao = 0  # diário trocado pela compactação
+            self._id_diario = id_diario
+            if id_diario[2] == self._posicao:
+                return self.versao
+
+            with open(self.arquivo_diario, "rb") as f:
+                f.seek(self._posicao)
+                trecho = f.read()
+            # Só linhas completas; uma gravação pela metade fica para depois
+            fim = trecho.rfind(b"\n") + 1
+            for linha in trecho[:fim].splitlines():
+                try:
+                    self._aplicar(json.loads(linha))
+                except (ValueError, KeyError):
+                    continue
+            self._posicao += fim
+            return self.versao
+
+    def dados(self):
+        """Dicionário atual (cópia própria do chamador, refeita só quando a versão muda)."""
+        with self._trava:
+            self.atualizar()
+            if self._copia is None or self._copia[0] != self.versao:
+                self._copia = (self.versao, dict(self._dados))
+            return self._copia[1]
+
+    def mudancas_desde(self, versao):
+        """
+        (versão atual, {chave: valor novo, ou None se removida}) com o que
+        mudou depois de `versao`. Devolve (versão atual, None) quando o
+        histórico já foi compactado e o chamador precisa reler dados().
+        """
+        with self._trava:
+            self.atualizar()
+            if versao < self._base:
+                return self.versao, None
+            inicio = bisect_right(self._historico, versao, key=lambda r: r[0])
+            return self.versao, {chave: valor for _, chave, valor in self._historico[inicio:]}
+
+    # --------------------------------------------------------
+    # Escrita
+    # --------------------------------------------------------
+    @contextmanager
+    def _exclusivo(self):
+        """Trava o diário entre processos (sem fcntl, só entre threads)."""
+        with self._trava:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.diretorio / f"{self.nome}.lock", "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def aplicar(self, alteracoes=None, remocoes=()):
+        """Grava no diário só o que de fato muda; retorna a nova versão."""
+        with self._exclusivo():
+            self.atualizar()
+            return self._gravar(alteracoes, remocoes)
+
+    def _gravar(self, alteracoes, remocoes):
+        """Acrescenta as alterações ao diário (chamado com a trava exclusiva)."""
+        registros, versao = [], self.versao
+        for chave, valor in (alteracoes or {}).items():
+            if self._dados.get(chave) != valor:
+                versao += 1
+                registros.append({"versao": versao, "chave": chave, "valor": valor})
+        for chave in remocoes:
+            if chave in self._dados:
+                versao += 1
+                registros.append({"versao": versao, "chave": chave, "removida": True})
+        if not registros:
+            return self.versao
+
+        with open(self.arquivo_diario, "ab") as f:
+            if f.tell() and not self._termina_em_linha():
+                f.write(b"\n")  # fecha uma gravação interrompida
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.atualizar()
+
+        if len(self._historico) > self.limite_diario:
+            self._compactar()
+        return self.versao
+
+    def _termina_em_linha(self):
+        with open(self.arquivo_diario, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def sincronizar(self, completo):
+        """Transforma um dicionário completo em alterações contra o atual."""
+        with self._exclusivo():
+            self.atualizar()
+            remocoes = [chave for chave in self._dados if chave not in completo]
+            return self._gravar(completo, remocoes)
+
+    def sincronizar_arquivo(self, caminho, maiusculas=False):
+        """
+        Acompanha um JSON reescrito por inteiro por outro programa (a API
+        Express). O arquivo só é relido quando sua assinatura muda, e só
+        a diferença entra no diário; arquivo ausente equivale a um dicionário
+        vazio. Levanta ValueError se o JSON for inválido.
+        """
+        caminho = Path(caminho)
+        assinatura = assinatura_arquivo(caminho) if caminho.exists() else None
+        with self._trava:
+            if str(caminho) in self._origens and self._origens[str(caminho)] == assinatura:
+                return self.atualizar()
+            with medicao.medir(f"Sincronização de {caminho.name}"):
+                completo = {}
+                if assinatura is not None:
+                    with open(caminho, "r", encoding="utf-8") as f:
+                        completo = json.load(f)
+                if maiusculas:
+                    completo = {k.upper(): v for k, v in completo.items()}
+                versao = self.sincronizar(completo)
+            self._origens[str(caminho)] = assinatura
+            return versao
+
+    def _compactar(self):
+        """Snapshot novo com tudo até a versão atual e diário vazio (chamado com a trava)."""
+        with medicao.medir(f"Compactação de {self.nome}"):
+            temporario = self.arquivo_snapshot.with_suffix(".tmp")
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"versao": self.versao, "dados": self._dados}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_snapshot)
+
+            # Registros que sobrarem no diário antigo têm versão <= snapshot
+            vazio = self.arquivo_diario.with_suffix(".jsonl.tmp")
+            vazio.write_bytes(b"")
+            os.replace(vazio, self.arquivo_diario)
+
+            self._base, self._historico = self.versao, []
+            self._id_snapshot = self._identificar(self.arquivo_snapshot)
+            self._id_diario, self._posicao = self._identificar(self.arquivo_diario), 0
+
+
+# ------------------------------------------------------------
+# Dicionários do projeto
+# ------------------------------------------------------------
+def obter(nome):
+    """Dicionário versionado compartilhado pelo processo."""
+    with _TRAVA:
+        loja = _LOJAS.get(nome)
+        if loja is None:
+            loja = _LOJAS[nome] = DicionarioVersionado(nome)
+        return loja
+
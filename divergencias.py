@@ -5,35 +5,34 @@ import re
 import json
 import streamlit.components.v1 as components
 
+from dados import carregar_saida, usa_banco
+import medicao
+import similaridade
+import indice_metrico
+
 # ------------------------------------------------------------
-# Distância de Levenshtein (implementação pura, com limpeza)
+# Distância de Levenshtein (com limpeza)
 # ------------------------------------------------------------
 def distancia_levenshtein(a, b):
-    a = re.sub(r'[^a-zA-Z0-9\s]', '', a).strip().lower()
-    b = re.sub(r'[^a-zA-Z0-9\s]', '', b).strip().lower()
-
-    if len(a) == 0:
-        return len(b)
-    if len(b) == 0:
-        return len(a)
-
-    dp = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
-
-    for i in range(len(a) + 1):
-        dp[i][0] = i
-    for j in range(len(b) + 1):
-        dp[0][j] = j
-
-    for i in range(1, len(a) + 1):
-        for j in range(1, len(b) + 1):
-            custo = 0 if a[i - 1] == b[j - 1] else 1
-            dp[i][j] = min(
-                dp[i - 1][j] + 1,
-                dp[i][j - 1] + 1,
-                dp[i - 1][j - 1] + custo
-            )
+    return similaridade.distancia(similaridade.limpar(a), similaridade.limpar(b))
 
-    return dp[-1][-1]
+
+# ------------------------------------------------------------
+# Limite do bloco de comparação (mesma inicial)
+# ------------------------------------------------------------
+def calcular_fim_bloco(descricoes):
+    """
+    Para cada posição i, retorna o índice exclusivo onde termina a sequência
+    de descrições com a mesma inicial (a lista já vem ordenada).
+    """
+    total = len(descricoes)
+    fim = [total] * total
+    for i in range(total - 2, -1, -1):
+        if descricoes[i + 1][0].lower() != descricoes[i][0].lower():
+            fim[i] = i + 1
+        else:
+            fim[i] = fim[i + 1]
+    return fim
 
 # ------------------------------------------------------------
 # Função para exportar resultados para CSV
@@ -59,11 +58,12 @@ def main():
     st.title("🔤 Agrupamento de Palavras (Janela dinâmica por inicial)")
 
     caminho = Path("saida.csv")
-    if not caminho.exists():
+    if not (usa_banco() or caminho.exists()):
         st.error("Arquivo 'saida.csv' não encontrado. Certifique-se de que ele está no diretório correto.")
         return
 
-    df = pd.read_csv(caminho, sep=";")
+    with medicao.medir("Leitura do CSV"):
+        df = carregar_saida()
     df["DescricaoManutencao"] = df["DescricaoManutencao"].astype(str).str.strip()
     df["idtarefa"] = df["idtarefa"].astype(str).str.strip()
     df = df[df["DescricaoManutencao"] != ""]
@@ -104,38 +104,28 @@ def main():
 
         resultados_finais = []
         grupos_para_export = []
-        visitadas = set()
-        total = len(dados)
-
-        for i in range(total):
-            p1, id1 = dados[i]
-            if p1 in visitadas:
-                continue
-            visitadas.add(p1)
-            grupo_atual = [(p1, id1)]
-            inicial = p1[0].lower()
-
-            j = i + 1
-            while j < total:
-                p2, id2 = dados[j]
-                if p2[0].lower() != inicial:
-                    break
-                if p2 not in visitadas:
-                    dist = distancia_levenshtein(p1, p2)
-                    if dist <= max_dist:
-                        visitadas.add(p2)
-                        grupo_atual.append((p2, id2))
-                j += 1
 
+        descricoes = [p for p, _ in dados]
+        with medicao.medir("Agrupamento Levenshtein", descricoes=len(descricoes)):
+            grupos = indice_metrico.agrupar_com_indice(
+                similaridade.limpar_lote(descricoes),
+                max_dist,
+                rotulos=descricoes,
+                blocos=calcular_fim_bloco(descricoes),
+                progresso=lambda feitos, total: progress_bar.progress(feitos / total),
+            )
+
+        for indices in grupos:
+            grupo_atual = [tuple(dados[k]) for k in indices]
             if len(grupo_atual) > 1:
                 grupos_para_export.append(grupo_atual)
                 resultados_finais.append("---")
                 for desc, ident in grupo_atual:
                     resultados_finais.append(f"[{ident}] {desc}\n")
                 resultados_finais.append("---")
-                placeholder.markdown("\n".join(resultados_finais))
 
-            progress_bar.progress((i + 1) / total)
+        with medicao.medir("Renderização dos grupos"):
+            placeholder.markdown("\n".join(resultados_finais))
 
         progress_bar.empty()
 
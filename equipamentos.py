@@ -0,0 +1,141 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Descrição de cada tipo (prefixo da tag_equipamento)
+DESCRICAO_VEICULOS = {
+    "CA": "Caminhão Aspirador", "CB": "Caminhão Basculante", "CC": "Caminhão Comboio",
+    "CG": "Caminhão Guincho", "CM": "Caminhão Munck", "CP": "Caminhão Pipa",
+    "CR": "Caminhão Rolo", "EH": "Escavadeira Hidráulica", "GA": "Guindaste Articulado",
+    "GG": "Guindaste Giratório", "MB": "Motoniveladora", "MN": "Mini Carregadeira",
+    "PC": "Pá Carregadeira", "PR": "Perfuratriz", "RC": "Rolo Compactador",
+    "RE": "Retroescavadeira", "TE": "Trator Esteira", "TI": "Trator Industrial",
+    "TP": "Trator de Pneus", "TS": "Trator Scraper", "VA": "Vibro Acabadora",
+    "VTR": "Viatura"
+}
+
+PADRAO_TIPO = re.compile(r"^[A-Za-z]+$")
+PADRAO_CODIGO = re.compile(r"^[0-9]+$")
+
+# Itens guardados em cada cache abaixo (os menos usados saem primeiro)
+LIMITE_CACHE_ITENS = int(os.getenv("EQUIPAMENTOS_CACHE_ITENS", "100000"))
+
+
+# ------------------------------------------------------------
+# Cache LRU limitado por número de itens
+# ------------------------------------------------------------
+class CacheLimitado:
+    """
+    Valores já calculados, do menos para o mais usado. Passando de
+    `limite` itens, os menos usados saem primeiro.
+    """
+
+    def __init__(self, limite):
+        self.limite = limite
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter_varios(self, chaves, calcular):
+        """Valor de cada chave; as que não estão no cache vêm de calcular(chave)."""
+        valores = []
+        with self._trava:
+            for chave in chaves:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    valores.append(self._itens[chave])
+                    continue
+                valor = self._itens[chave] = calcular(chave)
+                valores.append(valor)
+                if len(self._itens) > self.limite:
+                    self._itens.popitem(last=False)
+        return valores
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# Caches compartilhados por todas as páginas do processo
+_TAGS = CacheLimitado(LIMITE_CACHE_ITENS)       # tag bruta -> (tipo, código)
+_VEICULOS = CacheLimitado(LIMITE_CACHE_ITENS)   # (tipo, código) -> linha da tabela de dimensão
+
+
+# ------------------------------------------------------------
+# Separação das tags (uma vez por valor distinto)
+# ------------------------------------------------------------
+def separar_tag(tag):
+    """'CB-012' -> ('CB', '012'); sem '-' o código fica NaN."""
+    partes = str(tag).split("-")
+    return partes[0], partes[1] if len(partes) > 1 else np.nan
+
+
+def separar_tags(tags):
+    """
+    Tipo e código de cada linha de `tags`. Só os valores distintos passam
+    pela separação de texto (e os já vistos vêm do cache); as linhas
+    recebem o resultado por índice.
+    """
+    codigos, unicos = pd.factorize(tags, use_na_sentinel=False)
+    chaves = [str(tag) for tag in unicos]  # NaN vira 'nan', como no astype(str)
+    partes = _TAGS.obter_varios(chaves, separar_tag)
+
+    tipos = np.array([p[0] for p in partes], dtype=object)
+    numeros = np.array([p[1] for p in partes], dtype=object)
+    return (
+        pd.Series(tipos[codigos], index=tags.index),
+        pd.Series(numeros[codigos], index=tags.index),
+    )
+
+
+# ------------------------------------------------------------
+# Tabela de dimensão dos veículos
+# ------------------------------------------------------------
+def _linha_veiculo(tipo, codigo):
+    tipo_valido = isinstance(tipo, str) and bool(PADRAO_TIPO.match(tipo))
+    codigo_valido = isinstance(codigo, str) and bool(PADRAO_CODIGO.match(codigo))
+    return (
+        tipo,
+        codigo,
+        f"{tipo}-{codigo}" if codigo_valido else np.nan,
+        DESCRICAO_VEICULOS.get(tipo, np.nan),
+        tipo_valido,
+        tipo_valido and codigo_valido,
+    )
+
+
+def dimensao_veiculos(pares):
+    """
+    Tabela de dimensão alinhada a `pares` (sequência de (tipo, código),
+    p.ex. o índice de um groupby do cubo): tipo, codigo, veiculo
+    ('CB-012'), descricao e as flags tipo_valido / veiculo_valido.
+    As colunas de texto são categóricas. Pares já vistos vêm do cache.
+    """
+    # NaN != NaN: só texto entra na chave do cache
+    chaves = [tuple(v if isinstance(v, str) else None for v in par) for par in pares]
+    linhas = _VEICULOS.obter_varios(chaves, lambda chave: _linha_veiculo(*chave))
+
+    dimensao = pd.DataFrame(
+        linhas,
+        columns=["tipo", "codigo", "veiculo", "descricao", "tipo_valido", "veiculo_valido"],
+    )
+    for coluna in ["tipo", "codigo", "veiculo", "descricao"]:
+        dimensao[coluna] = dimensao[coluna].astype("category")
+    return dimensao
+
+
+def descricao(tipo):
+    """Descrição do tipo, ou o próprio tipo quando não está no dicionário."""
+    return DESCRICAO_VEICULOS.get(tipo, tipo)
+
+
+def limpar_cache():
+    """Esvazia os caches de tags e de veículos."""
+    _TAGS.limpar()
+    _VEICULOS.limpar()
@@ -1,2 +1,164 @@
 # estado_global.py
-DICIONARIO_UNIVERSAL = {}
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+
+from dados import DIRETORIO_CACHE
+
+# Banco compartilhado pelos workers do dashboard (mesmo caminho em todos)
+CAMINHO_BANCO = Path(os.getenv("ESTADO_GLOBAL_DB", DIRETORIO_CACHE / "estado_global.sqlite3"))
+INTERVALO_VERIFICACAO = float(os.getenv("ESTADO_GLOBAL_INTERVALO", "1.0"))  # segundos
+
+
+# ------------------------------------------------------------
+# Dicionário persistido em SQLite (WAL)
+# ------------------------------------------------------------
+class DicionarioCompartilhado(MutableMapping):
+    """
+    Dicionário chave -> valor (JSON) guardado numa tabela SQLite em modo
+    WAL, de modo que vários processos leem e escrevem o mesmo conteúdo e
+    ele sobrevive a reinícios.
+
+    As leituras vêm de uma cópia em memória, sem trava e sem SQL; no
+    máximo a cada `intervalo` segundos o PRAGMA data_version diz se outro
+    processo gravou algo, e só então a cópia é relida. Escritas em lote
+    (update/substituir) usam uma única transação.
+    """
+
+    def __init__(self, caminho=CAMINHO_BANCO, intervalo=INTERVALO_VERIFICACAO):
+        self.caminho = Path(caminho)
+        self.intervalo = intervalo
+        self._conexao = None
+        self._cache = {}
+        self._data_version = None
+        self._verificado = 0.0
+        self._trava = threading.Lock()
+
+    def _conectar(self):
+        if self._conexao is None:
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("PRAGMA busy_timeout=5000")
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS dicionario (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+            )
+            self._conexao = conexao
+        return self._conexao
+
+    def _sincronizar(self, forcar=False):
+        """Relê a tabela se outro processo a alterou desde a última verificação."""
+        agora = time.monotonic()
+        if not forcar and agora - self._verificado < self.intervalo:
+            return
+        with self._trava:
+            conexao = self._conectar()
+            versao = conexao.execute("PRAGMA data_version").fetchone()[0]
+            if versao != self._data_version:
+                linhas = conexao.execute("SELECT chave, valor FROM dicionario").fetchall()
+                self._cache = {chave: json.loads(valor) for chave, valor in linhas}
+                self._data_version = versao
+            self._verificado = agora
+
+    def _gravar(self, alteracoes, remocoes=(), completo=False):
+        """
+        Aplica alterações e remoções numa transação e na cópia em memória.
+        Com completo=True, `alteracoes` é o conteúdo inteiro desejado: a
+        diferença contra a tabela é calculada dentro da mesma transação
+        (BEGIN IMMEDIATE), de modo que gravações de outros processos feitas
+        antes dela entram na conta. Retorna (alteradas, removidas).
+        """
+        if not alteracoes and not remocoes and not completo:
+            return 0, 0
+        with self._trava:
+            conexao = self._conectar()
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                if completo:
+                    novo = alteracoes
+                    atual = {
+                        chave: json.loads(valor)
+                        for chave, valor in conexao.execute("SELECT chave, valor FROM dicionario")
+                    }
+                    alteracoes = {
+                        chave: valor for chave, valor in novo.items() if atual.get(chave, object()) != valor
+                    }
+                    remocoes = [chave for chave in atual if chave not in novo]
+                conexao.executemany(
+                    "INSERT INTO dicionario (chave, valor) VALUES (?, ?) "
+                    "ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor",
+                    [(chave, json.dumps(valor, ensure_ascii=False)) for chave, valor in alteracoes.items()],
+                )
+                conexao.executemany("DELETE FROM dicionario WHERE chave = ?", [(c,) for c in remocoes])
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+
+            # Cópia nova (leitores concorrentes continuam com a anterior)
+            if completo:
+                cache = dict(novo)
+            else:
+                cache = dict(self._cache)
+                cache.update(alteracoes)
+                for chave in remocoes:
+                    cache.pop(chave, None)
+            self._cache = cache
+            return len(alteracoes), len(remocoes)
+
+    # --------------------------------------------------------
+    # Interface de dicionário
+    # --------------------------------------------------------
+    def __getitem__(self, chave):
+        self._sincronizar()
+        return self._cache[chave]
+
+    def __setitem__(self, chave, valor):
+        self._gravar({chave: valor})
+
+    def __delitem__(self, chave):
+        self._sincronizar()
+        if chave not in self._cache:
+            raise KeyError(chave)
+        self._gravar({}, [chave])
+
+    def __iter__(self):
+        self._sincronizar()
+        return iter(list(self._cache))
+
+    def __len__(self):
+        self._sincronizar()
+        return len(self._cache)
+
+    def __contains__(self, chave):
+        self._sincronizar()
+        return chave in self._cache
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.caminho}, {len(self)} chaves)"
+
+    def update(self, outro=(), **kwargs):
+        """Várias chaves numa única transação."""
+        alteracoes = dict(outro, **kwargs)
+        self._gravar(alteracoes)
+
+    def substituir(self, novo):
+        """
+        Deixa o conteúdo igual a `novo` gravando só a diferença (chaves
+        novas ou alteradas e chaves removidas), numa única transação.
+        Retorna (alteradas, removidas).
+        """
+        return self._gravar(dict(novo), completo=True)
+
+    def copia(self):
+        """dict comum com o conteúdo atual."""
+        self._sincronizar()
+        return dict(self._cache)
+
+
+DICIONARIO_UNIVERSAL = DicionarioCompartilhado()
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import medicao
+
+# Limite de memória do cache de imagens (bytes de PNG guardados)
+LIMITE_CACHE_MB = float(os.getenv("GRAFICOS_CACHE_MB", "64"))
+
+
+# ------------------------------------------------------------
+# Cache LRU limitado por bytes
+# ------------------------------------------------------------
+class CacheImagens:
+    """
+    Guarda PNGs já renderizados, do menos para o mais usado. Quando o
+    total passa de `limite_bytes`, os menos usados saem primeiro.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self.total_bytes = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            imagem = self._itens.get(chave)
+            if imagem is not None:
+                self._itens.move_to_end(chave)
+            return imagem
+
+    def guardar(self, chave, imagem):
+        if len(imagem) > self.limite_bytes:
+            return
+        with self._trava:
+            antiga = self._itens.pop(chave, None)
+            if antiga is not None:
+                self.total_bytes -= len(antiga)
+            self._itens[chave] = imagem
+            self.total_bytes += len(imagem)
+            while self.total_bytes > self.limite_bytes:
+                _, removida = self._itens.popitem(last=False)
+                self.total_bytes -= len(removida)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+
+_CACHE = CacheImagens(int(LIMITE_CACHE_MB * 1024 * 1024))
+
+
+def chave_grafico(tipo, dados, tamanho):
+    """Hash do tipo de gráfico, dos dados plotados e do tamanho da figura."""
+    conteudo = json.dumps([tipo, dados, tamanho], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def renderizar(tipo, dados, tamanho, desenhar):
+    """
+    PNG do gráfico. `desenhar(fig, ax)` só é chamado (e o matplotlib só é
+    usado) quando a mesma combinação tipo/dados/tamanho não está no cache.
+    `dados` deve conter tudo que muda a imagem (valores, rótulos, título).
+    """
+    chave = chave_grafico(tipo, dados, tamanho)
+    imagem = _CACHE.obter(chave)
+    if imagem is not None:
+        return imagem
+
+    with medicao.medir(f"Renderização do gráfico ({tipo})"):
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=tamanho)
+        try:
+            desenhar(fig, ax)
+            buf = BytesIO()
+            fig.savefig(buf, format="png", bbox_inches='tight')
+        finally:
+            plt.close(fig)
+
+    imagem = buf.getvalue()
+    _CACHE.guardar(chave, imagem)
+    return imagem
+
+
+# ------------------------------------------------------------
+# Gráficos usados pelas páginas
+# ------------------------------------------------------------
+def pizza(valores, legenda, titulo, titulo_legenda="", tamanho=(4, 4)):
+    """Gráfico de pizza com percentuais e legenda ao lado (PNG)."""
+    valores = [float(v) for v in valores]
+    legenda = [str(item) for item in legenda]
+    dados = {"valores": valores, "legenda": legenda, "titulo": titulo, "titulo_legenda": titulo_legenda}
+
+    def desenhar(fig, ax):
+        ax.pie(valores, labels=None, autopct='%1.1f%%', startangle=90)
+        ax.set_title(titulo)
+        ax.legend(legenda, title=titulo_legenda, loc="center left", bbox_to_anchor=(1, 0.5))
+
+    return renderizar("pizza", dados, list(tamanho), desenhar)
+
+
+def limpar_cache():
+    """Esvazia o cache de imagens."""
+    _CACHE.limpar()
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import pickle
+import threading
+
+from rapidfuzz.distance import Levenshtein
+
+import similaridade
+from dados import DIRETORIO_CACHE
+
+# Acima deste raio a BK-tree visita quase todos os nós; compensa varrer
+# o bloco inteiro com o motor em lote.
+LIMITE_INDICE = 6
+
+_INDICES = {}
+_MAX_INDICES = 4
+# Índices mantidos em .cache/ (os usados há mais tempo são apagados)
+_MAX_ARQUIVOS = 8
+_TRAVA = threading.Lock()
+
+
+# ------------------------------------------------------------
+# BK-tree (árvore métrica para a distância de Levenshtein)
+# ------------------------------------------------------------
+class ArvoreBK:
+    """
+    Árvore de Burkhard-Keller guardada em listas planas (sem recursão),
+    para poder ser serializada com pickle independente do tamanho.
+    """
+
+    def __init__(self):
+        self._termos = []   # texto de cada nó
+        self._itens = []    # índices originais com esse mesmo texto
+        self._filhos = []   # {distância até o pai: nó filho}
+
+    def __len__(self):
+        return len(self._termos)
+
+    def _novo_no(self, termo, item):
+        self._termos.append(termo)
+        self._itens.append([item])
+        self._filhos.append({})
+        return len(self._termos) - 1
+
+    def adicionar(self, termo, item):
+        if not self._termos:
+            self._novo_no(termo, item)
+            return
+
+        no = 0
+        while True:
+            d = Levenshtein.distance(termo, self._termos[no])
+            if d == 0:
+                self._itens[no].append(item)
+                return
+            filho = self._filhos[no].get(d)
+            if filho is None:
+                self._filhos[no][d] = self._novo_no(termo, item)
+                return
+            no = filho
+
+    def buscar(self, termo, max_dist):
+        """Retorna os índices de todos os itens a até max_dist do termo."""
+        resultado = []
+        pilha = [0] if self._termos else []
+
+        while pilha:
+            no = pilha.pop()
+            d = Levenshtein.distance(termo, self._termos[no])
+            if d <= max_dist:
+                resultado.extend(self._itens[no])
+            for aresta, filho in self._filhos[no].items():
+                if d - max_dist <= aresta <= d + max_dist:
+                    pilha.append(filho)
+
+        return resultado
+
+
+# ------------------------------------------------------------
+# Índice por bloco, reaproveitado entre reruns
+# ------------------------------------------------------------
+def _assinatura(chaves, blocos):
+    h = hashlib.sha1()
+    for chave, bloco in zip(chaves, blocos):
+        h.update(f"{bloco}\x1f{chave}\x1e".encode("utf-8"))
+    return h.hexdigest()[:20]
+
+
+def construir_indice(chaves, blocos):
+    """Uma BK-tree por bloco: {bloco: ArvoreBK}."""
+    indice = {}
+    for i, (chave, bloco) in enumerate(zip(chaves, blocos)):
+        arvore = indice.get(bloco)
+        if arvore is None:
+            arvore = indice[bloco] = ArvoreBK()
+        arvore.adicionar(chave, i)
+    return indice
+
+
+def _gravar_indice(indice, arquivo):
+    """Grava o pickle de forma atômica (outro processo nunca lê pela metade)."""
+    temporario = arquivo.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        with open(temporario, "wb") as f:
+            pickle.dump(indice, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, arquivo)
+    except OSError:
+        temporario.unlink(missing_ok=True)
+
+
+def _podar_arquivos(manter=_MAX_ARQUIVOS):
+    """Apaga os índices em disco além dos `manter` usados mais recentemente."""
+    arquivos = []
+    for arquivo in DIRETORIO_CACHE.glob("indice-bk-*.pkl"):
+        try:
+            arquivos.append((arquivo.stat().st_mtime, arquivo))
+        except FileNotFoundError:
+            continue
+    arquivos.sort(reverse=True)
+    for _, arquivo in arquivos[manter:]:
+        arquivo.unlink(missing_ok=True)
+
+
+def obter_indice(chaves, blocos=None):
+    """
+    Devolve o índice das chaves, construindo-o só quando o conjunto de
+    descrições muda. Fica em memória e em .cache/ para próximos processos
+    (só os _MAX_ARQUIVOS usados mais recentemente são mantidos em disco).
+    O índice não depende do max_dist, então mudar o slider não o reconstrói.
+    """
+    if blocos is None:
+        blocos = [0] * len(chaves)
+
+    assinatura = _assinatura(chaves, blocos)
+    arquivo = DIRETORIO_CACHE / f"indice-bk-{assinatura}.pkl"
+
+    with _TRAVA:
+        indice = _INDICES.get(assinatura)
+        if indice is not None:
+            return indice
+
+        try:
+            with open(arquivo, "rb") as f:
+                indice = pickle.load(f)
+            os.utime(arquivo)  # marca como usado para a poda
+        except Exception:
+            indice = construir_indice(chaves, blocos)
+            _gravar_indice(indice, arquivo)
+            _podar_arquivos()
+
+        if len(_INDICES) >= _MAX_INDICES:
+            _INDICES.pop(next(iter(_INDICES)))
+        _INDICES[assinatura] = indice
+        return indice
+
+
+# ------------------------------------------------------------
+# Agrupamento guloso usando o índice
+# ------------------------------------------------------------
+def agrupar_com_indice(chaves, max_dist, rotulos=None, blocos=None, progresso=None):
+    """
+    Mesmo resultado de similaridade.agrupar_guloso com fim_bloco derivado de
+    blocos contíguos, mas buscando os vizinhos no índice em vez de varrer o
+    bloco. Retorna a lista de grupos (listas de índices).
+    """
+    total = len(chaves)
+    if rotulos is None:
+        rotulos = chaves
+    if blocos is None:
+        blocos = [0] * total
+
+    if max_dist >= LIMITE_INDICE:
+        fim_bloco = [total] * total
+        for i in range(total - 2, -1, -1):
+            fim_bloco[i] = i + 1 if blocos[i + 1] != blocos[i] else fim_bloco[i + 1]
+        return similaridade.agrupar_guloso(
+            chaves, max_dist, rotulos=rotulos, fim_bloco=fim_bloco, progresso=progresso
+        )
+
+    indice = obter_indice(chaves, blocos)
+    grupos = []
+    visitadas = set()
+    passo = max(total // 100, 1)
+
+    for i in range(total):
+        if rotulos[i] in visitadas:
+            continue
+        visitadas.add(rotulos[i])
+        grupo = [i]
+
+        for j in sorted(indice[blocos[i]].buscar(chaves[i], max_dist)):
+            if j > i and rotulos[j] not in visitadas:
+                visitadas.add(rotulos[j])
+                grupo.append(j)
+
+        grupos.append(grupo)
+
+        if progresso is not None and (i + 1) % passo == 0:
+            progresso(i + 1, total)
+
+    if progresso is not None:
+        progresso(total, total)
+    return grupos
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+from scipy import sparse
+
+# Memória de cada bloco de similaridades (float32, bloco x n) no modo exato
+ORCAMENTO_BLOCO_MB = float(os.getenv("VIZINHOS_BLOCO_MB", "64"))
+
+
+# ------------------------------------------------------------
+# Índice de vizinhos mais próximos (similaridade cosseno, CPU)
+# ------------------------------------------------------------
+def normalizar_linhas(vetores):
+    vetores = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return vetores / normas
+
+
+def tamanho_bloco_para(n, orcamento_bytes=None):
+    """Consultas por bloco para que o bloco x n de float32 caiba no orçamento."""
+    if orcamento_bytes is None:
+        orcamento_bytes = ORCAMENTO_BLOCO_MB * 2**20
+    return max(1, int(orcamento_bytes // (4 * max(n, 1))))
+
+
+class IndiceVizinhos:
+    """
+    Responde consultas top-k e por raio sobre embeddings sem montar a
+    matriz n x n: o modo exato processa as consultas em blocos cujo
+    tamanho sai do orçamento ORCAMENTO_BLOCO_MB (bloco x n float32; o
+    top_k ainda cria índices e cópias temporárias do mesmo formato) e o
+    modo aproximado usa pynndescent.
+
+    Todas as similaridades são cosseno; consultas por raio devolvem os
+    vizinhos com similaridade estritamente maior que o limiar.
+    """
+
+    def __init__(self, vetores, aproximado=False, tamanho_bloco=None, k_aproximado=30):
+        self.vetores = normalizar_linhas(vetores)
+        self.aproximado = aproximado
+        self.tamanho_bloco = tamanho_bloco or tamanho_bloco_para(len(self.vetores))
+        self.k_aproximado = k_aproximado
+        self._nnd = None
+
+        if aproximado:
+            from pynndescent import NNDescent
+
+            self._nnd = NNDescent(self.vetores, metric="cosine", n_neighbors=k_aproximado)
+            self._nnd.prepare()
+
+    def __len__(self):
+        return len(self.vetores)
+
+    def _blocos(self, consultas):
+        for inicio in range(0, len(consultas), self.tamanho_bloco):
+            bloco = consultas[inicio:inicio + self.tamanho_bloco]
+            yield inicio, bloco @ self.vetores.T
+
+    def top_k(self, consultas, k):
+        """Retorna (índices, similaridades), ambos (n_consultas, k), do mais similar ao menos."""
+        consultas = normalizar_linhas(consultas)
+        k = min(k, len(self))
+
+        if self._nnd is not None:
+            indices, distancias = self._nnd.query(consultas, k=k)
+            return indices, 1.0 - distancias
+
+        indices = np.empty((len(consultas), k), dtype=np.int64)
+        similaridades = np.empty((len(consultas), k), dtype=np.float32)
+        for inicio, sims in self._blocos(consultas):
+            parte = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            valores = np.take_along_axis(sims, parte, axis=1)
+            ordem = np.argsort(-valores, axis=1)
+            fim = inicio + len(sims)
+            indices[inicio:fim] = np.take_along_axis(parte, ordem, axis=1)
+            similaridades[inicio:fim] = np.take_along_axis(valores, ordem, axis=1)
+        return indices, similaridades
+
+    def grafo_raio(self, limiar, consultas=None):
+        """
+        Matriz esparsa (n_consultas x n) com as similaridades maiores que o
+        limiar. Sem consultas, usa os próprios vetores do índice. No modo
+        aproximado só os k_aproximado vizinhos de cada ponto são avaliados.
+        """
+        consultas = self.vetores if consultas is None else normalizar_linhas(consultas)
+
+        if self._nnd is not None:
+            indices, sims = self.top_k(consultas, self.k_aproximado)
+            linhas = np.repeat(np.arange(len(consultas)), indices.shape[1])
+            mascara = sims.ravel() > limiar
+            return sparse.csr_matrix(
+                (sims.ravel()[mascara], (linhas[mascara], indices.ravel()[mascara])),
+                shape=(len(consultas), len(self)),
+            )
+
+        partes = []
+        for _, sims in self._blocos(consultas):
+            sims[sims <= limiar] = 0
+            partes.append(sparse.csr_matrix(sims))
+        if not partes:
+            return sparse.csr_matrix((0, len(self)), dtype=np.float32)
+        return sparse.vstack(partes, format="csr")
+
+    def grafo_knn(self, k):
+        """
+        Matriz de conectividade kNN simétrica e binária (n x n), sem a
+        diagonal, no formato esperado pelo parâmetro `connectivity` do sklearn.
+        """
+        indices, _ = self.top_k(self.vetores, k + 1)
+        n = len(self)
+        linhas = np.repeat(np.arange(n), indices.shape[1])
+        colunas = indices.ravel()
+
+        mascara = colunas != linhas
+        linhas, colunas = linhas[mascara], colunas[mascara]
+
+        grafo = sparse.csr_matrix(
+            (np.ones(len(linhas), dtype=np.float32), (linhas, colunas)), shape=(n, n)
+        )
+        grafo = grafo.maximum(grafo.T)
+        grafo.data[:] = 1.0
+        return grafo
+
+
+def vizinhos_da_linha(grafo, i):
+    """Índices (ordenados) das colunas não nulas da linha i de um grafo CSR."""
+    return np.sort(grafo.indices[grafo.indptr[i]:grafo.indptr[i + 1]])
@@ -0,0 +1,124 @@
+import atexit
+import contextvars
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+_COLETOR = contextvars.ContextVar("medicao_coletor", default=None)
+_CAMINHO = contextvars.ContextVar("medicao_caminho", default=())
+
+
+# ------------------------------------------------------------
+# Coletor de spans de uma execução
+# ------------------------------------------------------------
+class Coletor:
+    """
+    Spans (etapas nomeadas) de uma execução: um rerun do Streamlit ou uma
+    chamada de script. Cada span guarda o caminho dos spans que o contêm,
+    o início relativo à execução e a duração.
+    """
+
+    def __init__(self, nome, inicio=None):
+        self.nome = nome
+        self.id = uuid.uuid4().hex[:12]
+        self.data = datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter() if inicio is None else inicio
+        self.spans = []
+
+    def registrar(self, nome, duracao, inicio=None, caminho=(), **atributos):
+        if inicio is None:
+            inicio = time.perf_counter() - duracao
+        self.spans.append({
+            "execucao": self.nome,
+            "id_execucao": self.id,
+            "data": self.data,
+            "span": " / ".join(caminho + (nome,)),
+            "nivel": len(caminho),
+            "inicio_ms": round((inicio - self.inicio) * 1000, 2),
+            "duracao_ms": round(duracao * 1000, 2),
+            **atributos,
+        })
+
+    def ordenados(self):
+        """Spans na ordem em que começaram (pais antes dos filhos)."""
+        return sorted(self.spans, key=lambda s: (s["inicio_ms"], s["nivel"]))
+
+    def jsonl(self):
+        return "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in self.ordenados())
+
+    def salvar_jsonl(self, caminho):
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(self.jsonl())
+
+    def imprimir(self):
+        for s in self.ordenados():
+            print(f"{'  ' * s['nivel']}{s['span'].split(' / ')[-1]}: {s['duracao_ms']:.0f} ms")
+
+
+# ------------------------------------------------------------
+# API
+# ------------------------------------------------------------
+@contextmanager
+def execucao(nome, inicio=None):
+    """
+    Abre um coletor para a execução (inicio = perf_counter de referência,
+    se a execução começou antes do with). Se MEDICAO_JSONL estiver
+    definido, os spans são anexados a esse arquivo ao final.
+    """
+    coletor = Coletor(nome, inicio)
+    token = _COLETOR.set(coletor)
+    token_caminho = _CAMINHO.set(())
+    try:
+        yield coletor
+    finally:
+        _CAMINHO.reset(token_caminho)
+        _COLETOR.reset(token)
+        _encerrar(coletor)
+
+
+def iniciar(nome):
+    """
+    Para scripts sem main(): ativa um coletor até o fim do processo. Os
+    spans vão para MEDICAO_JSONL (se definido) na saída do interpretador.
+    """
+    coletor = Coletor(nome)
+    _COLETOR.set(coletor)
+    _CAMINHO.set(())
+    atexit.register(_encerrar, coletor)
+    return coletor
+
+
+def _encerrar(coletor):
+    arquivo = os.environ.get("MEDICAO_JSONL")
+    if arquivo:
+        coletor.salvar_jsonl(arquivo)
+
+
+@contextmanager
+def medir(nome, **atributos):
+    """
+    Span nomeado. Fora de uma execucao() não faz nada, então as funções
+    instrumentadas podem ser chamadas de qualquer lugar (inclusive de
+    processos do pool, que não herdam o coletor).
+    """
+    coletor = _COLETOR.get()
+    if coletor is None:
+        yield
+        return
+
+    caminho = _CAMINHO.get()
+    token = _CAMINHO.set(caminho + (nome,))
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        _CAMINHO.reset(token)
+        coletor.registrar(nome, duracao, inicio, caminho, **atributos)
+
+
+def coletor_atual():
+    return _COLETOR.get()
@@ -1,21 +1,17 @@
+import os
+from pathlib import Path
+
 import pandas as pd
 import streamlit as st
 from io import StringIO
 
-def carregar_dados(caminho_arquivo, separador):
-    """Carrega o CSV e trata erros básicos."""
-    try:
-        df = pd.read_csv(caminho_arquivo, sep=separador, encoding="utf-8")
-        if df.empty:
-            st.error("O arquivo CSV está vazio.")
-            return None
-        return df
-    except FileNotFoundError:
-        st.error(f"Arquivo '{caminho_arquivo}' não encontrado.")
-        return None
-    except Exception as e:
-        st.error(f"Erro ao carregar o arquivo: {e}")
-        return None
+import dados
+import medicao
+import cubo
+
+# Arquivos acima deste tamanho são lidos em blocos por padrão
+LIMITE_BLOCOS_MB = 200
+TAMANHO_BLOCO = 200_000
 
 def processar_datas(df, col_data):
     """Converte a coluna de data e extrai mês e ano."""
@@ -23,7 +19,7 @@ def processar_datas(df, col_data):
         st.error(f"Coluna '{col_data}' não encontrada no CSV.")
         return None
     
-    df[col_data] = pd.to_datetime(df[col_data], errors="coerce")
+    df[col_data] = dados.converter_datas(df[col_data])
     df = df.dropna(subset=[col_data])
     if df.empty:
         st.warning("Nenhum registro válido após processar datas.")
@@ -33,16 +29,82 @@ def processar_datas(df, col_data):
     df["ano"] = df[col_data].dt.year
     return df
 
-def gerar_resumo(df, filtro_ano=None):
-    """Agrupa por mês e calcula total e média."""
+def ler_colunas(caminho_arquivo, separador):
+    """Só o cabeçalho do CSV (para escolher a coluna de data sem ler o arquivo)."""
+    try:
+        return list(pd.read_csv(caminho_arquivo, sep=separador, encoding="utf-8", nrows=0).columns)
+    except FileNotFoundError:
+        st.error(f"Arquivo '{caminho_arquivo}' não encontrado.")
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo: {e}")
+    return None
+
+def contar_por_mes_em_blocos(caminho_arquivo, separador, col_data, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Contagem de registros por (ano, mes) lendo só a coluna de data, em
+    blocos de tamanho_bloco linhas: a memória usada depende do bloco e
+    do número de meses, não do tamanho do arquivo. O formato da data é
+    inferido uma única vez (primeira data não nula do arquivo) e vale
+    para todos os blocos, como em processar_datas.
+    """
+    contagens, formato = None, None
+    blocos = pd.read_csv(
+        caminho_arquivo, sep=separador, encoding="utf-8",
+        usecols=[col_data], chunksize=tamanho_bloco,
+    )
+    for bloco in blocos:
+        if formato is None:
+            formato = dados.formato_datas(bloco[col_data])
+        datas = dados.converter_datas(bloco[col_data], formato).dropna()
+        parcial = datas.groupby([datas.dt.year.rename("ano"), datas.dt.month.rename("mes")]).size()
+        contagens = parcial if contagens is None else contagens.add(parcial, fill_value=0)
+
+    if contagens is None or contagens.empty:
+        return pd.DataFrame({"ano": [], "mes": [], "registros": []}, dtype="int64")
+    return contagens.astype("int64").rename("registros").reset_index()
+
+def carregar_contagens(caminho_arquivo, separador, col_data):
+    """contar_por_mes_em_blocos com cache por versão do arquivo."""
+    try:
+        versao = dados.assinatura_arquivo(caminho_arquivo)
+    except FileNotFoundError:
+        st.error(f"Arquivo '{caminho_arquivo}' não encontrado.")
+        return None
+    origem = ("meses", versao[0], separador, col_data)
+    return dados.memorizar(
+        origem, versao, lambda: contar_por_mes_em_blocos(caminho_arquivo, separador, col_data)
+    )
+
+def carregar_contagens_cubo(caminho_arquivo, separador, col_data):
+    """
+    Contagens por (ano, mes) tiradas do cubo agregado (cubo.py): só as
+    linhas novas do CSV são somadas, e o resto do caminho depende do
+    número de células do cubo, não do número de registros.
+    """
+    try:
+        versao = dados.assinatura_arquivo(caminho_arquivo)
+        origem = [str(Path(caminho_arquivo).resolve()), separador]
+        cubo_df = cubo.obter_cubo(
+            lambda: dados.carregar_csv(caminho_arquivo, sep=separador, encoding="utf-8"),
+            origem, versao, col_data,
+        )
+    except FileNotFoundError:
+        st.error(f"Arquivo '{caminho_arquivo}' não encontrado.")
+        return None
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo: {e}")
+        return None
+    return cubo.contagens_mensais(cubo_df)
+
+def resumo_de_contagens(contagens, filtro_ano=None):
+    """Total e média por mês a partir das contagens por (ano, mes)."""
     if filtro_ano:
-        df = df[df["ano"] == filtro_ano]
-        if df.empty:
+        contagens = contagens[contagens["ano"] == filtro_ano]
+        if contagens.empty:
             st.warning(f"Nenhum registro encontrado para o ano {filtro_ano}.")
             return None
-    
-    resumo_anual = df.groupby(["ano", "mes"]).size().reset_index(name="registros")
-    resumo = resumo_anual.groupby("mes").agg(
+
+    resumo = contagens.groupby("mes").agg(
         total=("registros", "sum"),
         media=("registros", "mean")
     ).reset_index()
@@ -53,6 +115,11 @@ def gerar_resumo(df, filtro_ano=None):
     resumo = resumo.sort_values("mes")
     return resumo
 
+def gerar_resumo(df, filtro_ano=None):
+    """Agrupa por mês e calcula total e média."""
+    contagens = df.groupby(["ano", "mes"]).size().reset_index(name="registros")
+    return resumo_de_contagens(contagens, filtro_ano)
+
 def exibir_metrica_topo(resumo):
     """Exibe métricas compactas no topo."""
     if resumo is not None and not resumo.empty:
@@ -76,38 +143,57 @@ def main():
     filtro_ano = st.sidebar.number_input("Filtrar por ano (0 = todos)", 0, 9999, 0)
     filtro_ano = filtro_ano if filtro_ano > 0 else None
 
-    df = carregar_dados(caminho_arquivo, separador)
-    if df is None:
+    # Arquivos grandes: só a coluna de data, em blocos (memória limitada)
+    grande = os.path.exists(caminho_arquivo) and os.path.getsize(caminho_arquivo) > LIMITE_BLOCOS_MB * 2**20
+    em_blocos = st.sidebar.toggle("Leitura em blocos (pouca memória)", value=grande)
+
+    with medicao.medir("Leitura do cabeçalho"):
+        colunas = ler_colunas(caminho_arquivo, separador)
+    if colunas is None:
         return
 
-    colunas_data = [c for c in df.columns if "data" in c.lower() or "date" in c.lower()]
+    colunas_data = [c for c in colunas if "data" in c.lower() or "date" in c.lower()]
     if colunas_data:
         col_data = st.sidebar.selectbox("Coluna de data", colunas_data)
     else:
         col_data = st.sidebar.text_input("Coluna de data", "DataEntrada")
 
-    df = processar_datas(df, col_data)
-    if df is None:
+    if col_data not in colunas:
+        st.error(f"Coluna '{col_data}' não encontrada no CSV.")
+        return
+
+    if em_blocos:
+        with medicao.medir("Contagem em blocos"):
+            contagens = carregar_contagens(caminho_arquivo, separador, col_data)
+    else:
+        with medicao.medir("Cubo de contagens"):
+            contagens = carregar_contagens_cubo(caminho_arquivo, separador, col_data)
+    if contagens is None:
+        return
+    if contagens.empty:
+        st.warning("Nenhum registro válido após processar datas.")
         return
 
-    resumo = gerar_resumo(df, filtro_ano)
+    with medicao.medir("Resumo mensal"):
+        resumo = resumo_de_contagens(contagens, filtro_ano)
     if resumo is None:
         return
 
-    # Métricas no topo
-    exibir_metrica_topo(resumo)
+    with medicao.medir("Renderização"):
+        # Métricas no topo
+        exibir_metrica_topo(resumo)
 
-    # Tabela resumida
-    st.dataframe(resumo[["mes_nome","total","media"]].rename(columns={"mes_nome":"Mês","total":"Total","media":"Média"}), use_container_width=True)
+        # Tabela resumida
+        st.dataframe(resumo[["mes_nome","total","media"]].rename(columns={"mes_nome":"Mês","total":"Total","media":"Média"}), use_container_width=True)
 
-    # Gráficos lado a lado com títulos
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("#### Total de Registros por Mês")
-        st.bar_chart(resumo.set_index("mes_nome")["total"], use_container_width=True)
-    with col2:
-        st.markdown("#### Média de Registros por Mês")
-        st.bar_chart(resumo.set_index("mes_nome")["media"], use_container_width=True)
+        # Gráficos lado a lado com títulos
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("#### Total de Registros por Mês")
+            st.bar_chart(resumo.set_index("mes_nome")["total"], use_container_width=True)
+        with col2:
+            st.markdown("#### Média de Registros por Mês")
+            st.bar_chart(resumo.set_index("mes_nome")["media"], use_container_width=True)
 
     # Download CSV
     csv_buffer = StringIO()
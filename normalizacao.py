@@ -0,0 +1,296 @@
+import re
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import medicao
+
+_NORMALIZADORES = {}
+_INCREMENTAIS = {}
+_PALAVRA = re.compile(r"\w+")
+_TRAVA = threading.Lock()
+
+
+# ------------------------------------------------------------
+# Padrão único em forma de trie
+# ------------------------------------------------------------
+def padrao_trie(termos):
+    """
+    Monta um único regex equivalente a \\b(?:t1|t2|...)\\b, mas organizado
+    como trie: em cada posição o motor segue só o ramo do próximo caractere
+    em vez de testar todos os termos. Entre os termos que casam na mesma
+    posição, vence o mais longo.
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for c in termo:
+            no = no.setdefault(c, {})
+        no[""] = {}
+
+    def montar(no):
+        ramos = [re.escape(c) + montar(filho) for c, filho in sorted(no.items()) if c]
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        if "" in no:
+            corpo = "(?:" + corpo + ")?"
+        return corpo
+
+    return re.compile(r"\b" + montar(trie) + r"\b")
+
+
+# ------------------------------------------------------------
+# Cadeias de sinônimos
+# ------------------------------------------------------------
+def resolver_cadeias(substituicoes):
+    """
+    Aplica na montagem as cadeias que o laço termo a termo de
+    servico.normalizar_descricao segue: com A -> B e, mais adiante na
+    ordem do dicionário, B -> C, o termo A passa a ir direto para C. Se
+    B -> C vem antes de A -> B, o laço já passou por B quando A é trocado
+    e a cadeia para em B, como lá. Cada passo avança na ordem, então
+    ciclos terminam sozinhos. Altera o próprio dicionário e retorna as
+    cadeias seguidas: termo -> [bases percorridas].
+    """
+    posicao = {termo: i for i, termo in enumerate(substituicoes)}
+    cadeias = {}
+    finais = {}
+    for termo, base in substituicoes.items():
+        caminho, atual = [base], posicao[termo]
+        while base in substituicoes and posicao[base] > atual:
+            atual = posicao[base]
+            base = substituicoes[base]
+            caminho.append(base)
+        if len(caminho) > 1:
+            cadeias[termo] = caminho
+        finais[termo] = base
+    substituicoes.update(finais)
+    return cadeias
+
+
+# ------------------------------------------------------------
+# Normalizador compilado
+# ------------------------------------------------------------
+class Normalizador:
+    """
+    Versão compilada de servico.normalizar_descricao: os sinônimos viram um
+    único padrão, aplicado em uma passada, e cada descrição distinta é
+    normalizada uma só vez.
+
+    Diferenças em relação ao laço termo a termo, que só aparecem quando
+    os termos se sobrepõem no texto:
+
+    - O padrão é percorrido da esquerda para a direita e, na mesma
+      posição, vence o termo mais longo; no laço vence o que vem antes
+      no dicionário. Com {'abc': 'z', 'c': 'q', 'ab c': 'zz'}, 'ab c bc'
+      vira 'zz bc' aqui e 'ab q bc' no laço.
+    - O texto substituído não é procurado de novo. Cadeias A -> B -> C
+      são resolvidas na montagem respeitando a ordem do dicionário
+      (resolver_cadeias, em `cadeias`), mas uma base que contém outro
+      termo, ou que só o forma junto com o texto vizinho, não é trocada
+      de novo: {'trocar oleo': 'substituir oleo', 'oleo': 'óleo'} dá
+      'substituir oleo' aqui e 'substituir óleo' no laço.
+
+    Com os dicionários do projeto os dois caminhos dão o mesmo resultado;
+    benchmarks/conferir_normalizacao.py confere isso.
+    """
+
+    def __init__(self, sinonimos, universal):
+        self.universal = universal
+        self.substituicoes = {}
+        for palavra, base in sinonimos.items():
+            palavra, base = palavra.lower(), base.lower()
+            if palavra and palavra != base:
+                self.substituicoes.setdefault(palavra, base)
+
+        self.cadeias = resolver_cadeias(self.substituicoes)
+        self._padrao = padrao_trie(self.substituicoes) if self.substituicoes else None
+
+    def __call__(self, texto):
+        return self.normalizar_com_consultas(texto)[0]
+
+    def normalizar_com_consultas(self, texto):
+        """
+        (resultado, chaves do universal consultadas). As chaves dizem de
+        quais entradas do universal o resultado depende.
+        """
+        if not isinstance(texto, str) or texto.strip() == "":
+            return texto, ()
+
+        original = texto.strip()
+        t_upper = original.upper()
+
+        # 1) Correspondência exata no dicionário universal
+        if t_upper in self.universal:
+            return self.universal[t_upper], (t_upper,)
+
+        # 2) Sinônimos em uma única passada
+        texto_lower = original.lower()
+        if self._padrao is not None:
+            texto_lower = self._padrao.sub(lambda m: self.substituicoes[m.group(0)], texto_lower)
+
+        # 3) Verifica novamente após aplicar sinônimos
+        chave = texto_lower.upper()
+        if chave in self.universal:
+            return self.universal[chave], (t_upper, chave)
+
+        # 4) Retorna versão limpa
+        return texto_lower, (t_upper, chave)
+
+    def normalizar_serie(self, serie):
+        """Normaliza só os valores distintos e espalha o resultado nas linhas."""
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+        resultados = np.empty(len(unicos), dtype=object)
+        resultados[:] = [self(t) for t in unicos]
+        return pd.Series(resultados[codigos], index=serie.index, name=serie.name)
+
+
+def obter_normalizador(sinonimos, universal, versao):
+    """
+    Devolve o normalizador compilado para esta versão dos dicionários
+    (ex.: assinaturas dos arquivos JSON), compilando só quando ela muda.
+    """
+    with _TRAVA:
+        normalizador = _NORMALIZADORES.get(versao)
+        if normalizador is None:
+            _NORMALIZADORES.clear()
+            normalizador = _NORMALIZADORES[versao] = Normalizador(sinonimos, universal)
+        return normalizador
+
+
+# ------------------------------------------------------------
+# Renormalização incremental
+# ------------------------------------------------------------
+class NormalizacaoIncremental:
+    """
+    Resultado da normalização de cada descrição distinta de `contagens`
+    (Series descrição -> registros), mantido em dia com os dicionários
+    versionados (dicionario_versionado) de sinônimos e universal.
+
+    Dois índices ligam os termos às descrições que dependem deles:
+    palavra -> descrições que a contêm (sinônimos) e chave do universal
+    -> descrições que a consultaram. Quando entradas mudam, só essas
+    descrições são renormalizadas e o ranking é corrigido pela diferença.
+    """
+
+    def __init__(self, contagens, loja_sinonimos, loja_universal):
+        self.contagens = contagens
+        self.lojas = (loja_sinonimos, loja_universal)
+        self.versoes = None
+        self.normalizador = None
+        self.resultado = {}                  # descrição -> normalizada
+        self.ranking = defaultdict(int)      # normalizada -> registros
+        self._consultas = defaultdict(set)   # chave do universal -> descrições
+        self._chaves = {}                    # descrição -> chaves consultadas
+        self._tabelas = None                 # (versões, tabela, ranking ordenado)
+        self._trava = threading.Lock()
+
+        self._palavras = defaultdict(set)    # palavra -> descrições
+        for descricao in contagens.index:
+            for palavra in set(_PALAVRA.findall(descricao.lower())):
+                self._palavras[palavra].add(descricao)
+
+    def _candidatas(self, termo):
+        """Descrições que contêm todas as palavras do termo (superconjunto das afetadas)."""
+        palavras = set(_PALAVRA.findall(termo))
+        if not palavras:
+            return set(self.contagens.index)
+        conjuntos = sorted((self._palavras.get(p, set()) for p in palavras), key=len)
+        return set.intersection(*conjuntos)
+
+    def _renormalizar(self, descricoes):
+        for descricao in descricoes:
+            novo, chaves = self.normalizador.normalizar_com_consultas(descricao)
+
+            for chave in self._chaves.get(descricao, ()):
+                self._consultas[chave].discard(descricao)
+            for chave in chaves:
+                self._consultas[chave].add(descricao)
+            self._chaves[descricao] = chaves
+
+            antigo = self.resultado.get(descricao)
+            if antigo == novo and descricao in self.resultado:
+                continue
+            registros = int(self.contagens[descricao])
+            if descricao in self.resultado:
+                self.ranking[antigo] -= registros
+                if not self.ranking[antigo]:
+                    del self.ranking[antigo]
+            self.ranking[novo] += registros
+            self.resultado[descricao] = novo
+
+    def sincronizar(self):
+        """Aplica as mudanças dos dicionários; retorna quantas descrições foram refeitas."""
+        loja_sinonimos, loja_universal = self.lojas
+        with self._trava:
+            if self.versoes is None:
+                versoes, mudancas = (loja_sinonimos.versao, loja_universal.versao), None
+            else:
+                v_sin, m_sin = loja_sinonimos.mudancas_desde(self.versoes[0])
+                v_uni, m_uni = loja_universal.mudancas_desde(self.versoes[1])
+                versoes, mudancas = (v_sin, v_uni), None
+                if m_sin is not None and m_uni is not None:
+                    mudancas = (m_sin, m_uni)
+                    if not m_sin and not m_uni:
+                        return 0
+
+            anterior = self.normalizador
+            self.normalizador = Normalizador(loja_sinonimos.dados(), loja_universal.dados())
+
+            if mudancas is None:
+                # Primeira carga (ou histórico compactado): tudo de novo
+                self.resultado, self.ranking = {}, defaultdict(int)
+                self._consultas, self._chaves = defaultdict(set), {}
+                afetadas = set(self.contagens.index)
+            else:
+                m_sin, m_uni = mudancas
+                # Com cadeias resolvidas, mudar B -> C altera também A -> B;
+                # por isso compara o resultado de todos os termos
+                afetadas = set()
+                termos = anterior.substituicoes.keys() | self.normalizador.substituicoes.keys()
+                for termo in termos:
+                    if anterior.substituicoes.get(termo) != self.normalizador.substituicoes.get(termo):
+                        afetadas |= self._candidatas(termo)
+                for chave in m_uni:
+                    afetadas |= self._consultas.get(chave, set())
+
+            with medicao.medir("Renormalização", descricoes=len(afetadas)):
+                self._renormalizar(afetadas)
+            self.versoes = versoes
+            return len(afetadas)
+
+    def tabelas(self):
+        """
+        (DescricaoManutencao/DescricaoNormalizada/registros, ranking) já
+        ordenados por registros; refeitos só quando os dicionários mudam.
+        """
+        self.sincronizar()
+        with self._trava:
+            if self._tabelas is None or self._tabelas[0] != self.versoes:
+                tabela = pd.DataFrame({
+                    "DescricaoManutencao": self.contagens.index,
+                    "DescricaoNormalizada": [self.resultado[d] for d in self.contagens.index],
+                    "registros": self.contagens.to_numpy(),
+                }).sort_values("registros", ascending=False)
+                ranking = pd.Series(self.ranking, dtype="int64").sort_values(ascending=False)
+                self._tabelas = (self.versoes, tabela, ranking)
+            return self._tabelas[1].copy(deep=False), self._tabelas[2].copy(deep=False)
+
+
+def obter_incremental(chave, carregar_contagens, loja_sinonimos, loja_universal):
+    """
+    Normalização incremental das contagens identificadas por `chave`
+    (ex.: origem e versão dos dados). carregar_contagens() só é chamado
+    quando a chave muda.
+    """
+    with _TRAVA:
+        incremental = _INCREMENTAIS.get(chave)
+        if incremental is None:
+            _INCREMENTAIS.clear()
+            incremental = _INCREMENTAIS[chave] = NormalizacaoIncremental(
+                carregar_contagens(), loja_sinonimos, loja_universal
+            )
+    return incremental
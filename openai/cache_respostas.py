@@ -0,0 +1,86 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+ARQUIVO_CACHE = Path(__file__).resolve().parent / "cache_respostas.sqlite3"
+
+
+# ------------------------------------------------------
+# Cache local das respostas do Manus, por grupo
+# ------------------------------------------------------
+def identificar_prompt(etapa, versao_prompt, modelo_prompt):
+    """
+    Identificador do template: etapa, versão e hash do texto do prompt
+    montado sem grupos. Etapas diferentes (etapa1_2, etapa5) nunca
+    compartilham respostas, e editar o texto invalida o cache mesmo que
+    a versão não tenha sido incrementada.
+    """
+    resumo = hashlib.sha256(modelo_prompt.encode("utf-8")).hexdigest()[:16]
+    return f"{etapa}:{versao_prompt}:{resumo}"
+
+
+def chave_grupo(id_prompt, grupo, agent):
+    """Hash de (identificador do template, conteúdo do grupo, perfil do agente)."""
+    conteudo = json.dumps([id_prompt, list(grupo), agent], ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """
+    Guarda, para cada grupo já enviado, o pedaço do dicionário que a IA
+    devolveu para as frases daquele grupo.
+    """
+
+    def __init__(self, caminho=ARQUIVO_CACHE):
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            " chave TEXT PRIMARY KEY,"
+            " resposta TEXT NOT NULL,"
+            " criado REAL NOT NULL)"
+        )
+        self.conexao.commit()
+
+    def buscar(self, grupos, id_prompt, agent):
+        """
+        Retorna (dicionário já conhecido, posições dos grupos que precisam
+        ir para a API).
+        """
+        conhecido = {}
+        faltantes = []
+        for i, grupo in enumerate(grupos):
+            linha = self.conexao.execute(
+                "SELECT resposta FROM respostas WHERE chave = ?",
+                (chave_grupo(id_prompt, grupo, agent),),
+            ).fetchone()
+            if linha is None:
+                faltantes.append(i)
+            else:
+                conhecido.update(json.loads(linha[0]))
+        return conhecido, faltantes
+
+    def guardar(self, grupos, resposta, id_prompt, agent):
+        """
+        Separa a resposta por grupo e grava cada parte. Grupos com alguma
+        frase sem resposta não são gravados e voltam à API na próxima vez.
+        """
+        registros = []
+        agora = time.time()
+        for grupo in grupos:
+            if not all(frase in resposta for frase in grupo):
+                continue
+            parte = {frase: resposta[frase] for frase in grupo}
+            registros.append((
+                chave_grupo(id_prompt, grupo, agent),
+                json.dumps(parte, ensure_ascii=False),
+                agora,
+            ))
+
+        with self.conexao:
+            self.conexao.executemany(
+                "INSERT OR REPLACE INTO respostas (chave, resposta, criado) VALUES (?, ?, ?)",
+                registros,
+            )
+        return len(registros)
@@ -1,5 +1,12 @@
+import asyncio
 import os
+import random
+import threading
+import time
+
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,9 +20,85 @@ MANUS_HEADERS = {
     "API_KEY": MANUS_API_KEY
 }
 
-
+# Configuração do cliente (sobrescrevível pelo .env)
+MANUS_TIMEOUT = float(os.getenv("MANUS_TIMEOUT", "30"))            # segundos por requisição
+MANUS_TENTATIVAS = int(os.getenv("MANUS_TENTATIVAS", "5"))         # tentativas por requisição
+MANUS_ESPERA_BASE = float(os.getenv("MANUS_ESPERA_BASE", "1"))     # base do backoff exponencial
+MANUS_ESPERA_MAX = float(os.getenv("MANUS_ESPERA_MAX", "30"))      # teto do backoff
+MANUS_CONCORRENCIA = int(os.getenv("MANUS_CONCORRENCIA", "8"))     # requisições simultâneas
+MANUS_TEMPO_MAX = float(os.getenv("MANUS_TEMPO_MAX", "1800"))      # espera máxima por tarefa (s)
+MANUS_SEM_STATUS = int(os.getenv("MANUS_SEM_STATUS", "10"))        # consultas seguidas sem status
+
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+STATUS_FALHA = {"failed", "error", "cancelled"}
+
+_sessao = None
+_trava_sessao = threading.Lock()
+_limite = threading.BoundedSemaphore(MANUS_CONCORRENCIA)
+
+
+# ------------------------------------------------------
+# Sessão HTTP compartilhada (reaproveita conexões TCP/TLS)
+# ------------------------------------------------------
+def obter_sessao():
+    global _sessao
+    with _trava_sessao:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=MANUS_CONCORRENCIA)
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            sessao.headers.update(MANUS_HEADERS)
+            _sessao = sessao
+        return _sessao
+
+
+def _espera(tentativa):
+    """Backoff exponencial com jitter completo."""
+    return random.uniform(0, min(MANUS_ESPERA_MAX, MANUS_ESPERA_BASE * 2 ** tentativa))
+
+
+def _falha_de_conexao(erro):
+    """True quando a requisição nem chegou ao servidor (conexão não aberta)."""
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return True
+    motivo = getattr(erro.args[0], "reason", None) if erro.args else None
+    return isinstance(motivo, urllib3.exceptions.NewConnectionError)
+
+
+def _requisitar(metodo, url, **kwargs):
+    """
+    Faz a requisição com timeout, limite de concorrência e novas tentativas.
+    Métodos idempotentes repetem em falhas de rede e status transitórios
+    (429/5xx). Um POST cria tarefa (cobrada) no Manus: só é repetido quando
+    a conexão nem foi aberta ou com 429, nunca após timeout de leitura ou
+    5xx, em que o servidor pode já ter aceitado o pedido.
+    """
+    kwargs.setdefault("timeout", MANUS_TIMEOUT)
+    idempotente = metodo.upper() in METODOS_IDEMPOTENTES
+    repetir_status = STATUS_REPETIR if idempotente else {429}
+
+    for tentativa in range(MANUS_TENTATIVAS):
+        ultima = tentativa == MANUS_TENTATIVAS - 1
+        try:
+            with _limite:
+                response = obter_sessao().request(metodo, url, **kwargs)
+            if response.status_code not in repetir_status or ultima:
+                return response
+            print(f"Manus respondeu {response.status_code}, nova tentativa...")
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if ultima or not (idempotente or _falha_de_conexao(e)):
+                raise
+            print("Falha de conexão com Manus, nova tentativa:", e)
+
+        time.sleep(_espera(tentativa))
+
+
+# ------------------------------------------------------
+# API síncrona
+# ------------------------------------------------------
 def manus_post(prompt: str, agent: str = "manus-1.5-lite") -> dict:
-    print("Iniciando")
     """
     Envia um prompt para o Manus AI e retorna o JSON da resposta.
 
@@ -23,31 +106,30 @@ def manus_post(prompt: str, agent: str = "manus-1.5-lite") -> dict:
     :param agent: Perfil do agente (manus-1.5 ou manus-1.5-lite)
     :return: dicionário JSON com a resposta do Manus
     """
+    print("Iniciando")
     payload = {
         "prompt": prompt,
         "agentProfile": agent
     }
 
     try:
-        response = requests.post(MANUS_URL, json=payload, headers=MANUS_HEADERS)
+        response = _requisitar("POST", MANUS_URL, json=payload)
         response.raise_for_status()
         return response.json()
 
     except requests.exceptions.RequestException as e:
         print("Erro ao acessar Manus API:", e)
         return {"error": str(e)}
-    
-    
-
-import requests
 
 
 def manus_get(task_id):
     url = f"{MANUS_URL}/{task_id}"
 
-    headers = {"API_KEY": MANUS_API_KEY}
-
-    response = requests.get(url, headers=headers)
+    try:
+        response = _requisitar("GET", url)
+    except requests.exceptions.RequestException as e:
+        print("Erro ao acessar Manus API:", e)
+        return None
 
     # apenas para debug
     print("GET STATUS:", response.status_code)
@@ -58,4 +140,92 @@ def manus_get(task_id):
         print("ERRO AO PARSER JSON:", response.text)
         return None
 
-    return data                   # ← retorna dict
\ No newline at end of file
+    return data                   # ← retorna dict
+
+
+def _verificar_status(task_id, result, inicio, tempo_max, sem_status):
+    """
+    Interpreta uma consulta; retorna o novo contador de consultas sem
+    status. Levanta RuntimeError em falha, tempo esgotado ou quando a
+    tarefa passa MANUS_SEM_STATUS consultas seguidas sem status.
+    """
+    status = (result or {}).get("status")
+    if status in STATUS_FALHA:
+        raise RuntimeError(f"Tarefa {task_id} terminou com status '{status}'")
+    if tempo_max is not None and time.monotonic() - inicio > tempo_max:
+        raise RuntimeError(f"Tarefa {task_id} excedeu {tempo_max}s")
+    sem_status = 0 if status else sem_status + 1
+    if sem_status >= MANUS_SEM_STATUS:
+        raise RuntimeError(f"Tarefa {task_id} sem status após {sem_status} consultas")
+    return sem_status
+
+
+def aguardar_tarefa(task_id, intervalo=2, tempo_max=MANUS_TEMPO_MAX):
+    """
+    Consulta a tarefa até ela terminar e retorna o JSON final.
+    Levanta RuntimeError se a tarefa falhar, passar de tempo_max segundos
+    ou ficar MANUS_SEM_STATUS consultas seguidas sem status.
+    """
+    if not task_id:
+        raise RuntimeError("Tarefa do Manus sem task_id")
+
+    inicio, sem_status = time.monotonic(), 0
+    while True:
+        result = manus_get(task_id)
+        if (result or {}).get("status") == "completed":
+            return result
+        sem_status = _verificar_status(task_id, result, inicio, tempo_max, sem_status)
+
+        print(f"Ainda processando... aguardando {intervalo}s")
+        time.sleep(intervalo)
+
+
+def executar_tarefa(prompt, agent="manus-1.5-lite", intervalo=2, tempo_max=MANUS_TEMPO_MAX):
+    """Envia o prompt e aguarda o resultado."""
+    resposta = manus_post(prompt, agent)
+    if "error" in resposta:
+        raise RuntimeError(resposta["error"])
+    return aguardar_tarefa(resposta.get("task_id"), intervalo, tempo_max)
+
+
+# ------------------------------------------------------
+# API assíncrona (várias tarefas em paralelo)
+# ------------------------------------------------------
+async def manus_post_async(prompt, agent="manus-1.5-lite"):
+    return await asyncio.to_thread(manus_post, prompt, agent)
+
+
+async def manus_get_async(task_id):
+    return await asyncio.to_thread(manus_get, task_id)
+
+
+async def aguardar_tarefa_async(task_id, intervalo=2, tempo_max=MANUS_TEMPO_MAX):
+    if not task_id:
+        raise RuntimeError("Tarefa do Manus sem task_id")
+
+    inicio, sem_status = time.monotonic(), 0
+    while True:
+        result = await manus_get_async(task_id)
+        if (result or {}).get("status") == "completed":
+            return result
+        sem_status = _verificar_status(task_id, result, inicio, tempo_max, sem_status)
+
+        await asyncio.sleep(intervalo)
+
+
+async def executar_tarefa_async(prompt, agent="manus-1.5-lite", intervalo=2, tempo_max=MANUS_TEMPO_MAX):
+    resposta = await manus_post_async(prompt, agent)
+    if "error" in resposta:
+        raise RuntimeError(resposta["error"])
+    return await aguardar_tarefa_async(resposta.get("task_id"), intervalo, tempo_max)
+
+
+async def executar_tarefas_async(prompts, agent="manus-1.5-lite", intervalo=2, tempo_max=MANUS_TEMPO_MAX):
+    """
+    Envia vários prompts de uma vez e aguarda todos. Retorna os resultados
+    na mesma ordem; uma tarefa que falhou aparece como a exceção levantada.
+    """
+    return await asyncio.gather(
+        *(executar_tarefa_async(p, agent, intervalo, tempo_max) for p in prompts),
+        return_exceptions=True,
+    )
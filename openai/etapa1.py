@@ -2,6 +2,11 @@ import pandas as pd
 from pathlib import Path
 import re
 from Levenshtein import distance as lev
+import sys
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import medicao
 
 # ------------------------------------------------------
 # Funções auxiliares
@@ -68,35 +73,40 @@ def agrupar_levenshtein(palavras, max_dist=5):
 # CARREGA CSV E EXTRAI VERBOS
 # ------------------------------------------------------
 
-caminho = Path("saida.csv")
-df = pd.read_csv(caminho, sep=";")
+coletor = medicao.iniciar("etapa1")
+
+with medicao.medir("Leitura do CSV"):
+    caminho = Path("saida.csv")
+    df = pd.read_csv(caminho, sep=";")
 
-df["DescricaoManutencao"] = (
-    df["DescricaoManutencao"]
-    .astype(str)
-    .str.strip()
-)
+    df["DescricaoManutencao"] = (
+        df["DescricaoManutencao"]
+        .astype(str)
+        .str.strip()
+    )
 
-df = df[df["DescricaoManutencao"] != ""]
+    df = df[df["DescricaoManutencao"] != ""]
 
 # Extrai verbo inicial normalizado
-verbos = set()
+with medicao.medir("Extração dos verbos"):
+    verbos = set()
 
-for descricao in df["DescricaoManutencao"]:
-    palavras = descricao.lower().split()
-    if not palavras:
-        continue
+    for descricao in df["DescricaoManutencao"]:
+        palavras = descricao.lower().split()
+        if not palavras:
+            continue
 
-    verbo = normalizar_verbo(descricao)
-    verbos.add(verbo)
+        verbo = normalizar_verbo(descricao)
+        verbos.add(verbo)
 
-verbos = list(sorted(verbos))
+    verbos = list(sorted(verbos))
 
 # ------------------------------------------------------
 # AGRUPAMENTO ETAPA 1
 # ------------------------------------------------------
 
-grupos = agrupar_levenshtein(verbos)
+with medicao.medir("Agrupamento Levenshtein"):
+    grupos = agrupar_levenshtein(verbos)
 
 # ------------------------------------------------------
 # EXIBE RESULTADO
@@ -107,4 +117,6 @@ for g in grupos:
     print(g)
 
 print("\nTotal de verbos antes:", len(verbos))
-print("Total de grupos depois:", len(grupos))
\ No newline at end of file
+print("Total de grupos depois:", len(grupos))
+
+coletor.imprimir()
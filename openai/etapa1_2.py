@@ -2,66 +2,26 @@ import pandas as pd
 from pathlib import Path
 import re
 from Levenshtein import distance as lev
-from conn import manus_post,manus_get
-from prompt import get_prompt
-from time import sleep
+from conn import executar_tarefa
+from prompt import get_prompt, VERSAO_PROMPT
+from cache_respostas import CacheRespostas, identificar_prompt
+from resposta import extrair_dict_valido, extract_response_text
 import ast
 import json
+import sys
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import medicao
 #import requests
 # ------------------------------------------------------
 # Funções auxiliares
 # ------------------------------------------------------
 
-PREPOSICOES = {"de", "da", "do", "das", "dos", "a", "o", "na", "no"}
-
-
-
-def extrair_dict_valido(texto):
-    # Captura qualquer trecho entre { e }
-    matches = re.findall(r"\{[\s\S]*?\}", texto)
-
-    candidatos = []
-
-    # Tentamos converter cada match
-    for m in matches:
-        try:
-            d = ast.literal_eval(m)
-            if isinstance(d, dict):
-                candidatos.append((len(m), d))  # guardar tamanho para escolher o maior
-        except:
-            continue
-
-    if not candidatos:
-        raise ValueError("Nenhum dicionário válido encontrado na resposta da IA")
-
-    # Retorna o maior dicionário encontrado
-    candidatos.sort(reverse=True)
-    return candidatos[0][1]
-
-
+AGENTE = "manus-1.5-lite"
+ID_PROMPT = identificar_prompt("etapa1_2", VERSAO_PROMPT, get_prompt([]))  # chave do cache de respostas
 
-def extract_response_text(result):
-    if "output" not in result:
-        return None
-    
-    texts = []
-    for block in result["output"]:
-        if "content" not in block:
-            continue
-        for item in block["content"]:
-            if item.get("type") == "output_text":
-                texts.append(item.get("text"))
-    
-    return "\n".join(texts)
-
-import re
-
-def extract_only_dict(text):
-    # encontra o dicionário Python entre chaves
-    match = re.search(r"\{[\s\S]*\}", text)
-    if match:
-        return match.group(0)
-    return None
+PREPOSICOES = {"de", "da", "do", "das", "dos", "a", "o", "na", "no"}
 
 
 
@@ -128,35 +88,40 @@ def agrupar_centro_fixo(palavras, limiar=0.80):
 # CARREGA CSV E EXTRAI VERBOS
 # ------------------------------------------------------
 
-caminho = Path("saida.csv")
-df = pd.read_csv(caminho, sep=";")
+coletor = medicao.iniciar("etapa1_2")
+
+with medicao.medir("Leitura do CSV"):
+    caminho = Path("saida.csv")
+    df = pd.read_csv(caminho, sep=";")
 
-df["DescricaoManutencao"] = (
-    df["DescricaoManutencao"]
-    .astype(str)
-    .str.strip()
-)
+    df["DescricaoManutencao"] = (
+        df["DescricaoManutencao"]
+        .astype(str)
+        .str.strip()
+    )
 
-df = df[df["DescricaoManutencao"] != ""]
+    df = df[df["DescricaoManutencao"] != ""]
 
 # Extrai verbo inicial normalizado
-verbos = set()
+with medicao.medir("Extração dos verbos"):
+    verbos = set()
 
-for descricao in df["DescricaoManutencao"]:
-    palavras = descricao.lower().split()
-    if not palavras:
-        continue
+    for descricao in df["DescricaoManutencao"]:
+        palavras = descricao.lower().split()
+        if not palavras:
+            continue
 
-    verbo = normalizar_verbo(descricao)
-    verbos.add(verbo)
+        verbo = normalizar_verbo(descricao)
+        verbos.add(verbo)
 
-verbos = list(sorted(verbos))
+    verbos = list(sorted(verbos))
 
 # ------------------------------------------------------
 # AGRUPAMENTO ETAPA 1
 # ------------------------------------------------------
 
-grupos = agrupar_centro_fixo(verbos, limiar=0.80)
+with medicao.medir("Agrupamento por centro fixo"):
+    grupos = agrupar_centro_fixo(verbos, limiar=0.80)
 
 # ------------------------------------------------------
 # EXIBE RESULTADO
@@ -167,32 +132,30 @@ for g in grupos:
     print(g)
 
 
-prompt = get_prompt(grupos)
-
-response = manus_post(prompt)
-print(response)
-
-while True:
-    sleep(3)
-    result = manus_get(response.get('task_id'))
-    if result.get("status") == "completed":
-        
-        break
-    print("Ainda processando... aguardando 2s")
-    sleep(2)
-print("JSON COMPLETO:", result)
-response_text = extract_response_text(result)
-print("===")
-print(response_text)
+# ------------------------------------------------------
+# CONSULTA A IA (só para grupos novos ou alterados)
+# ------------------------------------------------------
 
+with medicao.medir("Consulta à IA"):
+    cache = CacheRespostas()
+    dicionario, faltantes = cache.buscar(grupos, ID_PROMPT, AGENTE)
+    grupos_novos = [grupos[i] for i in faltantes]
+    print(f"{len(grupos) - len(grupos_novos)} grupos vieram do cache, {len(grupos_novos)} novos")
 
-inicio = response_text.rfind("{")
-fim = response_text.rfind("}")
+    if grupos_novos:
+        prompt = get_prompt(grupos_novos)
 
-print("===Only dict===")
+        result = executar_tarefa(prompt, AGENTE)
+        print("JSON COMPLETO:", result)
+        response_text = extract_response_text(result)
+        print("===")
+        print(response_text)
 
+        print("===Only dict===")
 
-dicionario = extrair_dict_valido(response_text)
+        novo = extrair_dict_valido(response_text)
+        cache.guardar(grupos_novos, novo, ID_PROMPT, AGENTE)
+        dicionario.update(novo)
 
 
 # Converte para dict
@@ -203,6 +166,7 @@ with open("dicionario.json", "w", encoding="utf-8") as f:
     json.dump(dicionario, f, ensure_ascii=False, indent=4)
 
 print("JSON salvo com sucesso!")
+coletor.imprimir()
 
 
 
@@ -1,8 +1,17 @@
+import sys
 import pandas as pd
 from collections import defaultdict
+from pathlib import Path
 from dicionario import dicionario_universal
-from etapa4 import agrupar_por_objeto,segunda_rodada_levenshtein
+from etapa4 import processar_verbo
+from particionado import executar_particionado, exportar_lotes, juntar_resultados
 from etapa5 import dicionario_final
+import argparse
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import medicao
+
 CSV_PATH = "saida.csv"
 
 # ---------------------------
@@ -19,57 +28,83 @@ def normalizar_verbo(frase: str):
     verbo_normalizado = dicionario_universal.get(verbo, verbo)
     return verbo_normalizado
 
-# ---------------------------
-# Carrega CSV e frases únicas
-# ---------------------------
 
-df = pd.read_csv(CSV_PATH, sep=";")
-df["DescricaoManutencao"] = df["DescricaoManutencao"].astype(str).str.strip()
-df = df[df["DescricaoManutencao"] != ""]
+def main():
+    parser = argparse.ArgumentParser(description="Etapas 3 a 5: agrupamento por verbo e objeto")
+    parser.add_argument("--processos", type=int, default=None,
+                        help="Processos locais para a etapa 4 (padrão: todos os núcleos)")
+    parser.add_argument("--exportar-lotes", metavar="DIR",
+                        help="Só grava os lotes para trabalhadores remotos (particionado.py)")
+    parser.add_argument("--n-lotes", type=int, default=8)
+    parser.add_argument("--juntar-lotes", metavar="DIR",
+                        help="Usa os resultados já produzidos pelos trabalhadores")
+    args = parser.parse_args()
+    coletor = medicao.iniciar("etapa3")
 
-frases_unicas = df["DescricaoManutencao"].drop_duplicates().tolist()
-frases_unicas = sorted(frases_unicas)
+    # ---------------------------
+    # Carrega CSV e frases únicas
+    # ---------------------------
 
-# ---------------------------
-# Agrupamento apenas pelo verbo normalizado
-# ---------------------------
+    with medicao.medir("Leitura do CSV"):
+        df = pd.read_csv(CSV_PATH, sep=";")
+        df["DescricaoManutencao"] = df["DescricaoManutencao"].astype(str).str.strip()
+        df = df[df["DescricaoManutencao"] != ""]
 
-grupos_por_verbo = defaultdict(list)
+        frases_unicas = df["DescricaoManutencao"].drop_duplicates().tolist()
+        frases_unicas = sorted(frases_unicas)
 
-for frase in frases_unicas:
-    verbo = normalizar_verbo(frase)
-    if verbo:
-        grupos_por_verbo[verbo].append(frase)
+    # ---------------------------
+    # Agrupamento apenas pelo verbo normalizado
+    # ---------------------------
 
-# ---------------------------
-# Exibe resultados
-# ---------------------------
+    with medicao.medir("Agrupamento por verbo"):
+        grupos_por_verbo = defaultdict(list)
+
+        for frase in frases_unicas:
+            verbo = normalizar_verbo(frase)
+            if verbo:
+                grupos_por_verbo[verbo].append(frase)
+
+    # ---------------------------
+    # Etapa 4: cada verbo é uma partição independente
+    # ---------------------------
+
+    if args.exportar_lotes:
+        n = exportar_lotes(grupos_por_verbo, args.exportar_lotes, args.n_lotes)
+        print(f"{n} lotes gravados em {args.exportar_lotes}")
+        return
+
+    print("Iniciando etapa 4")
+
+    with medicao.medir("Etapa 4", verbos=len(grupos_por_verbo)):
+        if args.juntar_lotes:
+            por_verbo = juntar_resultados(args.juntar_lotes)
+        else:
+            por_verbo = executar_particionado(
+                processar_verbo, grupos_por_verbo, args.processos,
+                limiar=4, limiar_refino=4, tamanho_max=10,
+            )
 
-#for verbo, frases in grupos_por_verbo.items():
-#    print("VERBO NORMALIZADO:", verbo)
-#    print("FRASES DO GRUPO:", frases)
-#    print("-" * 40)
-    
-    
-print("Iniciando etapa 4")
+    grupos_refinados = {verbo: grupos for verbo, grupos in por_verbo.items() if grupos}
 
-grupos_final = agrupar_por_objeto(grupos_por_verbo)
+    # Impressão resumida
+    for verbo, grupos in grupos_refinados.items():
+        print(f"VERBO: {verbo}")
+        for i, g in enumerate(grupos, 1):
+            print(f"  GRUPO {i} ({len(g)} itens): {g}")
+        print("-"*50)
 
-grupos_refinados = segunda_rodada_levenshtein(grupos_final, limiar=4, tamanho_max=10)
+    print(grupos_refinados)
 
+    with medicao.medir("Etapa 5"):
+        json_final = dicionario_final(grupos_refinados)
 
+    coletor.imprimir()
 
-# Impressão resumida
-for verbo, grupos in grupos_refinados.items():
-    print(f"VERBO: {verbo}")
-    for i, g in enumerate(grupos, 1):
-        print(f"  GRUPO {i} ({len(g)} itens): {g}")
-    print("-"*50)
-    
 
-print(grupos_refinados)
+if __name__ == "__main__":
+    main()
 
-json_final = dicionario_final(grupos_refinados)
 
 #segunda rodada do levenshtein
 
@@ -1,5 +1,14 @@
+import sys
 from collections import defaultdict
+from pathlib import Path
 from Levenshtein import distance as lev
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import medicao
 
 def extrair_objeto(frase: str) -> str:
     """
@@ -13,38 +22,97 @@ def extrair_objeto(frase: str) -> str:
 
 
 
-def agrupar_por_objeto(grupos_por_verbo: dict, limiar=4):
+class IndiceCentros:
     """
-    Recebe um dicionário {verbo: [frases]} e retorna
-    um dicionário {verbo: [grupos_de_frases]} agrupadas pelo objeto
-    usando distância de Levenshtein.
+    Índice dos objetos-centro dos grupos já criados, separados por tamanho.
+    Um centro só pode estar a até `limiar` edições se a diferença de tamanho
+    for no máximo `limiar`, então só esses baldes são consultados, cada um
+    com uma única chamada vetorizada de Levenshtein com corte em `limiar`.
     """
-    resultado = defaultdict(list)
 
-    for verbo, frases in grupos_por_verbo.items():
-        grupos_objetos = []
+    def __init__(self, limiar):
+        self.limiar = limiar
+        self.total = 0
+        self.ids = defaultdict(list)      # tamanho -> ids dos grupos (crescentes)
+        self.objetos = defaultdict(list)  # tamanho -> objetos-centro
+
+    def adicionar(self, objeto):
+        gid = self.total
+        self.total += 1
+        self.ids[len(objeto)].append(gid)
+        self.objetos[len(objeto)].append(objeto)
+        return gid
+
+    def buscar(self, objeto):
+        """Primeiro grupo (ordem de criação) cujo centro está a até limiar."""
+        k = self.limiar
+        melhor = None
+
+        for t in range(max(len(objeto) - k, 0), len(objeto) + k + 1):
+            objetos = self.objetos.get(t)
+            if not objetos:
+                continue
+            distancias = process.cdist(
+                [objeto], objetos, scorer=Levenshtein.distance,
+                score_cutoff=k, dtype=np.int32, workers=1,
+            )[0]
+            posicao = np.flatnonzero(distancias <= k)
+            if len(posicao):
+                gid = self.ids[t][posicao[0]]
+                if melhor is None or gid < melhor:
+                    melhor = gid
+
+        return melhor
+
+
+def agrupar_frases(frases, limiar=4, indexado=True):
+    """
+    Agrupamento guloso por objeto: cada frase entra no primeiro grupo cujo
+    centro (primeira frase) tem objeto a até `limiar` edições; senão abre
+    um grupo novo. O modo indexado produz exatamente os mesmos grupos.
+    """
+    grupos = []
 
+    if not indexado:
         for frase in frases:
             objeto = extrair_objeto(frase)
             colocado = False
-
-            # Tenta adicionar a frase em um grupo existente
-            for grupo in grupos_objetos:
+            for grupo in grupos:
                 objeto_centro = extrair_objeto(grupo[0])
                 if lev(objeto, objeto_centro) <= limiar:
                     grupo.append(frase)
                     colocado = True
                     break
-
-            # Se não coube em nenhum grupo, cria um novo
             if not colocado:
-                grupos_objetos.append([frase])
+                grupos.append([frase])
+        return grupos
+
+    indice = IndiceCentros(limiar)
+    for frase in frases:
+        objeto = extrair_objeto(frase)
+        gid = indice.buscar(objeto)
+        if gid is None:
+            indice.adicionar(objeto)
+            grupos.append([frase])
+        else:
+            grupos[gid].append(frase)
+    return grupos
+
+
+def agrupar_por_objeto(grupos_por_verbo: dict, limiar=4, indexado=True):
+    """
+    Recebe um dicionário {verbo: [frases]} e retorna
+    um dicionário {verbo: [grupos_de_frases]} agrupadas pelo objeto
+    usando distância de Levenshtein.
+    """
+    resultado = defaultdict(list)
 
-        resultado[verbo] = grupos_objetos
+    for verbo, frases in grupos_por_verbo.items():
+        resultado[verbo] = agrupar_frases(frases, limiar, indexado)
 
     return resultado
 
-def segunda_rodada_levenshtein(grupos_final: dict, limiar=4, tamanho_max=10):
+def segunda_rodada_levenshtein(grupos_final: dict, limiar=4, tamanho_max=10, indexado=True):
     """
     Para cada verbo, aplica uma segunda rodada de Levenshtein nos grupos grandes.
     """
@@ -54,18 +122,7 @@ def segunda_rodada_levenshtein(grupos_final: dict, limiar=4, tamanho_max=10):
         for grupo in grupos:
             # Se o grupo for grande, refinar novamente
             if len(grupo) > tamanho_max:
-                subgrupos = []
-                for frase in grupo:
-                    objeto = extrair_objeto(frase)
-                    colocado = False
-                    for sg in subgrupos:
-                        objeto_centro = extrair_objeto(sg[0])
-                        if lev(objeto, objeto_centro) <= limiar:
-                            sg.append(frase)
-                            colocado = True
-                            break
-                    if not colocado:
-                        subgrupos.append([frase])
+                subgrupos = agrupar_frases(grupo, limiar, indexado)
                 # Adiciona apenas subgrupos com 2 ou mais elementos
                 for sg in subgrupos:
                     if len(sg) >= 2:
@@ -79,6 +136,18 @@ def segunda_rodada_levenshtein(grupos_final: dict, limiar=4, tamanho_max=10):
 
 
 
+def processar_verbo(frases, limiar=4, limiar_refino=4, tamanho_max=10):
+    """
+    Pipeline completo de um verbo (uma partição independente):
+    agrupamento por objeto seguido da segunda rodada nos grupos grandes.
+    """
+    with medicao.medir("Agrupamento por objeto", frases=len(frases)):
+        grupos = agrupar_frases(frases, limiar)
+    with medicao.medir("Segunda rodada"):
+        refinado = segunda_rodada_levenshtein({None: grupos}, limiar_refino, tamanho_max)
+    return refinado.get(None, [])
+
+
 # ----------------------
 # Exemplo de uso
 # ----------------------
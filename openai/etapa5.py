@@ -1,16 +1,46 @@
-from time import sleep
-from conn import manus_get, manus_post
+import asyncio
+import sys
+from pathlib import Path
 
-def criar_prompt_universal(grupos_refinados):
-    """
-    Cria o prompt para Manus a partir de grupos refinados.
-    Cada chave é apenas um contexto (nome do grupo), e cada lista interna contém frases.
-    """
+from conn import executar_tarefa_async
+from resposta import extrair_resultado
+from cache_respostas import CacheRespostas, identificar_prompt
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import medicao
+
+# Incrementar ao mudar o texto do prompt: invalida o cache de respostas
+VERSAO_PROMPT = 1
+AGENTE = "manus-1.5-lite"
+
+# Orçamento aproximado de tokens por prompt (instruções + grupos)
+LIMITE_TOKENS = 6000
+TENTATIVAS_LOTE = 3
+
+
+def estimar_tokens(texto):
+    """Estimativa simples: ~4 caracteres por token."""
+    return len(texto) // 4 + 1
+
+
+def montar_prompt_dict(grupos_refinados):
+    """Achata {verbo: [grupos]} em {verbo_i: grupo}."""
     prompt_dict = {}
     for verbo, grupos in grupos_refinados.items():
         for i, grupo in enumerate(grupos, start=1):
             chave = f"{verbo}_{i}"  # apenas contexto
             prompt_dict[chave] = grupo
+    return prompt_dict
+
+
+def criar_prompt_universal(grupos_refinados, prompt_dict=None):
+    """
+    Cria o prompt para Manus a partir de grupos refinados.
+    Cada chave é apenas um contexto (nome do grupo), e cada lista interna contém frases.
+    """
+    if prompt_dict is None:
+        prompt_dict = montar_prompt_dict(grupos_refinados)
 
     prompt_texto = f"""
 Você receberá um dicionário com chaves representando grupos e valores que são listas de frases.
@@ -37,24 +67,84 @@ Agora, processe o seguinte dicionário:
 """
     return prompt_texto
 
-def dicionario_final(grupos_refinados):
-    prompt = criar_prompt_universal(grupos_refinados)
-    
-    # Envia para o Manus
-    resposta_post = manus_post(prompt)
-    task_id = resposta_post.get('task_id')
-    
-    # Aguarda até a tarefa ser concluída
-    while True:
-        sleep(2)
-        result = manus_get(task_id)
-        status = result.get("status")
-        if status == "completed":
-            break
-        print("Ainda processando... aguardando 2s")
-    
-    # Resultado final
-    json_final = result.get("result")  # assumindo que o Manus retorna o JSON aqui
+
+# Chave do cache de respostas: etapa + versão + hash do texto do template
+ID_PROMPT = identificar_prompt("etapa5", VERSAO_PROMPT, criar_prompt_universal({}, prompt_dict={}))
+
+
+def montar_lotes(prompt_dict, limite_tokens=LIMITE_TOKENS):
+    """
+    Divide os grupos ({verbo_i: grupo}) em lotes cujo prompt cabe em
+    limite_tokens. Um grupo nunca é quebrado; se sozinho passar do limite,
+    vira um lote.
+    """
+    base = estimar_tokens(criar_prompt_universal({}, prompt_dict={}))
+    orcamento = max(limite_tokens - base, 1)
+
+    lotes = []
+    atual, tokens_atual = {}, 0
+    for chave, grupo in prompt_dict.items():
+        tokens = estimar_tokens(repr({chave: grupo}))
+        if atual and tokens_atual + tokens > orcamento:
+            lotes.append(atual)
+            atual, tokens_atual = {}, 0
+        atual[chave] = grupo
+        tokens_atual += tokens
+
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+async def processar_lote(lote, agent=AGENTE, tentativas=TENTATIVAS_LOTE):
+    """Envia um lote e repete apenas ele em caso de falha."""
+    prompt = criar_prompt_universal({}, prompt_dict=lote)
+    for tentativa in range(1, tentativas + 1):
+        try:
+            result = await executar_tarefa_async(prompt, agent)
+            return extrair_resultado(result)
+        except (RuntimeError, ValueError) as e:
+            print(f"Lote {list(lote)[:3]}... falhou (tentativa {tentativa}/{tentativas}): {e}")
+            if tentativa == tentativas:
+                raise
+
+
+async def dicionario_final_async(grupos_refinados, limite_tokens=LIMITE_TOKENS, agent=AGENTE):
+    prompt_dict = montar_prompt_dict(grupos_refinados)
+
+    # Grupos já respondidos antes não voltam para a API
+    with medicao.medir("Cache de respostas"):
+        cache = CacheRespostas()
+        itens = list(prompt_dict.items())
+        json_final, faltantes = cache.buscar([g for _, g in itens], ID_PROMPT, agent)
+        pendentes = dict(itens[i] for i in faltantes)
+    print(f"{len(itens) - len(pendentes)} grupos vieram do cache, {len(pendentes)} pendentes")
+
+    with medicao.medir("Montagem dos lotes"):
+        lotes = montar_lotes(pendentes, limite_tokens)
+    print(f"Enviando {len(lotes)} lotes ao Manus")
+
+    with medicao.medir("Chamadas ao Manus", lotes=len(lotes)):
+        resultados = await asyncio.gather(
+            *(processar_lote(lote, agent) for lote in lotes), return_exceptions=True
+        )
+
+    # Junta os dicionários de cada lote, na ordem dos lotes
+    falhas = []
+    for lote, resultado in zip(lotes, resultados):
+        if isinstance(resultado, Exception):
+            falhas.extend(lote)
+            continue
+        cache.guardar(lote.values(), resultado, ID_PROMPT, agent)
+        json_final.update(resultado)
+
+    if falhas:
+        print("ATENÇÃO: grupos sem resposta após todas as tentativas:", falhas)
+    return json_final
+
+
+def dicionario_final(grupos_refinados, limite_tokens=LIMITE_TOKENS):
+    json_final = asyncio.run(dicionario_final_async(grupos_refinados, limite_tokens))
     print("JSON COMPLETO:", json_final)
     return json_final
 
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from etapa4 import processar_verbo
+
+# Reserva mais antiga que isso volta para a fila mesmo com dono vivo (outra máquina)
+PRAZO_RESERVA = float(os.getenv("PRAZO_RESERVA_HORAS", "24")) * 3600
+
+
+# ------------------------------------------------------
+# Execução local em um pool de processos
+# ------------------------------------------------------
+def executar_particionado(funcao, particoes: dict, processos=None, **kwargs):
+    """
+    Aplica funcao(frases, **kwargs) a cada partição {chave: frases} em um
+    pool de processos. As maiores partições são enviadas primeiro (assim
+    o verbo mais pesado não fica para o fim) e o resultado volta na ordem
+    original das chaves, independente de qual processo terminou antes.
+    """
+    ordem = sorted(particoes, key=lambda chave: len(particoes[chave]), reverse=True)
+
+    if processos == 1 or len(particoes) <= 1:
+        return {chave: funcao(particoes[chave], **kwargs) for chave in particoes}
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {chave: executor.submit(funcao, particoes[chave], **kwargs) for chave in ordem}
+        return {chave: futuros[chave].result() for chave in particoes}
+
+
+# ------------------------------------------------------
+# Execução em várias máquinas via diretório compartilhado
+# ------------------------------------------------------
+def distribuir(particoes: dict, n_lotes):
+    """Reparte as partições em n_lotes com carga parecida (maior primeiro)."""
+    lotes = [{} for _ in range(n_lotes)]
+    cargas = [0] * n_lotes
+    for chave in sorted(particoes, key=lambda c: len(particoes[c]), reverse=True):
+        destino = cargas.index(min(cargas))
+        lotes[destino][chave] = particoes[chave]
+        cargas[destino] += len(particoes[chave])
+    return [lote for lote in lotes if lote]
+
+
+def exportar_lotes(particoes: dict, diretorio, n_lotes):
+    """
+    Grava lote-NNN.json e ordem.json (ordem original das chaves). Lotes,
+    reservas e resultados de execuções anteriores são apagados antes.
+    """
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    for padrao in ("lote-*.json", "lote-*.reservado", "resultado-*.json", "resultado-*.tmp"):
+        for antigo in diretorio.glob(padrao):
+            antigo.unlink(missing_ok=True)
+
+    with open(diretorio / "ordem.json", "w", encoding="utf-8") as f:
+        json.dump(list(particoes), f, ensure_ascii=False)
+
+    lotes = distribuir(particoes, n_lotes)
+    for i, lote in enumerate(lotes):
+        with open(diretorio / f"lote-{i:03d}.json", "w", encoding="utf-8") as f:
+            json.dump(lote, f, ensure_ascii=False)
+    return len(lotes)
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recuperar_reservas(diretorio, prazo=PRAZO_RESERVA):
+    """
+    Devolve à fila (lote-NNN.json) as reservas abandonadas: as desta
+    máquina cujo processo já morreu e qualquer uma mais antiga que
+    `prazo` segundos. O nome da reserva traz máquina e pid, e o mtime é
+    o momento da reserva. Retorna quantas foram recuperadas.
+    """
+    diretorio = Path(diretorio)
+    recuperadas = 0
+    for reservado in diretorio.glob("lote-*.reservado"):
+        lote, _, dono = reservado.stem.partition(".")
+        maquina, _, pid = dono.rpartition("-")
+        try:
+            idade = time.time() - reservado.stat().st_mtime
+        except FileNotFoundError:
+            continue
+
+        abandonada = idade > prazo or (
+            maquina == socket.gethostname() and pid.isdigit() and not _processo_vivo(int(pid))
+        )
+        if abandonada and not (diretorio / f"resultado-{lote[len('lote-'):]}.json").exists():
+            try:
+                os.rename(reservado, diretorio / f"{lote}.json")
+                recuperadas += 1
+            except OSError:
+                continue  # outro trabalhador recuperou primeiro
+    return recuperadas
+
+
+def trabalhar(diretorio, processos=None, **kwargs):
+    """
+    Consome lotes pendentes até não sobrar nenhum. Cada lote é reservado
+    por um rename atômico, então várias máquinas podem dividir a fila;
+    reservas de trabalhadores que morreram voltam antes para a fila.
+    """
+    diretorio = Path(diretorio)
+    processados = 0
+
+    n = recuperar_reservas(diretorio)
+    if n:
+        print(f"{n} reservas abandonadas devolvidas à fila")
+
+    for lote in sorted(diretorio.glob("lote-*.json")):
+        reservado = lote.with_name(f"{lote.stem}.{socket.gethostname()}-{os.getpid()}.reservado")
+        try:
+            os.rename(lote, reservado)
+        except OSError:
+            continue  # outro trabalhador pegou este lote
+        os.utime(reservado)  # mtime = início da reserva
+
+        with open(reservado, "r", encoding="utf-8") as f:
+            particoes = json.load(f)
+
+        resultado = executar_particionado(processar_verbo, particoes, processos, **kwargs)
+
+        saida = diretorio / lote.name.replace("lote-", "resultado-")
+        temporario = saida.with_suffix(".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False)
+        os.replace(temporario, saida)
+        reservado.unlink(missing_ok=True)
+        processados += 1
+
+    return processados
+
+
+def juntar_resultados(diretorio):
+    """Junta resultado-NNN.json na ordem original das partições."""
+    diretorio = Path(diretorio)
+    with open(diretorio / "ordem.json", "r", encoding="utf-8") as f:
+        ordem = json.load(f)
+
+    resultados = {}
+    for arquivo in sorted(diretorio.glob("resultado-*.json")):
+        with open(arquivo, "r", encoding="utf-8") as f:
+            resultados.update(json.load(f))
+
+    faltando = [chave for chave in ordem if chave not in resultados]
+    if faltando:
+        raise RuntimeError(f"{len(faltando)} partições ainda sem resultado: {faltando[:5]}")
+
+    return {chave: resultados[chave] for chave in ordem}
+
+
+# ------------------------------------------------------
+# Linha de comando (modo várias máquinas)
+# ------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trabalhador da etapa 4 particionada por verbo")
+    parser.add_argument("diretorio", help="Diretório compartilhado com os lotes")
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+
+    n = trabalhar(args.diretorio, args.processos)
+    print(f"{n} lotes processados")
@@ -1,3 +1,7 @@
+# Incrementar ao mudar o texto do prompt: invalida o cache de respostas
+VERSAO_PROMPT = 1
+
+
 def get_prompt(grupos):
     grupos_texto = "\n".join(str(g) for g in grupos)
 
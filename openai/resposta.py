@@ -0,0 +1,63 @@
+import ast
+import re
+
+# ------------------------------------------------------
+# Leitura das respostas do Manus
+# ------------------------------------------------------
+
+def extrair_dict_valido(texto):
+    # Captura qualquer trecho entre { e }
+    matches = re.findall(r"\{[\s\S]*?\}", texto)
+
+    candidatos = []
+
+    # Tentamos converter cada match
+    for m in matches:
+        try:
+            d = ast.literal_eval(m)
+            if isinstance(d, dict):
+                candidatos.append((len(m), d))  # guardar tamanho para escolher o maior
+        except:
+            continue
+
+    if not candidatos:
+        raise ValueError("Nenhum dicionário válido encontrado na resposta da IA")
+
+    # Retorna o maior dicionário encontrado
+    candidatos.sort(key=lambda c: c[0], reverse=True)
+    return candidatos[0][1]
+
+
+
+def extract_response_text(result):
+    if "output" not in result:
+        return None
+    
+    texts = []
+    for block in result["output"]:
+        if "content" not in block:
+            continue
+        for item in block["content"]:
+            if item.get("type") == "output_text":
+                texts.append(item.get("text"))
+    
+    return "\n".join(texts)
+
+def extract_only_dict(text):
+    # encontra o dicionário Python entre chaves
+    match = re.search(r"\{[\s\S]*\}", text)
+    if match:
+        return match.group(0)
+    return None
+
+
+def extrair_resultado(result):
+    """
+    Retorna o dicionário produzido pela tarefa: usa o campo 'result' quando
+    ele já vem como dict; senão procura o dicionário no texto de saída.
+    """
+    if isinstance(result.get("result"), dict):
+        return result["result"]
+
+    texto = extract_response_text(result) or str(result.get("result") or "")
+    return extrair_dict_valido(texto)
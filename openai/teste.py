@@ -1,7 +1,13 @@
-from sentence_transformers import SentenceTransformer, util
+import sys
+from pathlib import Path
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cache_embeddings
+from indice_vizinhos import IndiceVizinhos, vizinhos_da_linha
 
 # Modelo leve para CPU
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODELO = "all-MiniLM-L6-v2"
 
 # Lista de verbos iniciais
 verbos = [
@@ -22,11 +28,11 @@ frases = [
 ]
 
 # Gerar embeddings
-embeddings = model.encode(frases, convert_to_tensor=True)
+embeddings = cache_embeddings.codificar(frases, MODELO)
 
-# Similaridade coseno
-sim_matrix = util.cos_sim(embeddings, embeddings).numpy()
+# Vizinhos com similaridade coseno acima do limiar (grafo esparso, sem matriz n x n)
 threshold = 0.75  # ajustar se quiser mais ou menos agrupamento
+vizinhos = IndiceVizinhos(embeddings).grafo_raio(threshold)
 
 # Agrupamento e escolha da frase canônica
 dicionario = {}
@@ -39,8 +45,8 @@ for i, frase in enumerate(frases):
     grupo = [frase]
     visitados.add(i)
     
-    for j in range(i+1, len(frases)):
-        if sim_matrix[i][j] > threshold:
+    for j in vizinhos_da_linha(vizinhos, i):
+        if j > i:
             grupo.append(frases[j])
             visitados.add(j)
     
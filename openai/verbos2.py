@@ -1,10 +1,20 @@
+import sys
 import pandas as pd
 import re
 from pathlib import Path
 from rapidfuzz.distance import Levenshtein
 import numpy as np
+from scipy.sparse.csgraph import connected_components
 from sklearn.cluster import AgglomerativeClustering
-from sentence_transformers import SentenceTransformer
+
+# Módulos compartilhados ficam na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cache_embeddings
+from indice_vizinhos import IndiceVizinhos
+
+# Acima deste número de rótulos a matriz de distâncias completa não cabe
+# confortavelmente na memória: usa-se o modo esparso (grafo kNN).
+LIMITE_DENSO = 5000
 
 
 # ------------------------------------------------------
@@ -124,7 +134,41 @@ def processar_csv(caminho: str):
     print(result)
     return grupos_finais
 
-def agrupar_sinonimos_semanticos(grupos_leven, distancia=1.0):
+def rotular_esparso(embeddings, distancia, k_vizinhos=15):
+    """
+    Agrupamento aglomerativo (cosseno, média) restrito a um grafo kNN:
+    só pares vizinhos podem ser unidos. Cada componente conexa do grafo é
+    agrupada separadamente, então a memória cresce com n * k, não com n².
+    """
+    n = len(embeddings)
+    indice = IndiceVizinhos(embeddings, aproximado=n > LIMITE_DENSO)
+    conectividade = indice.grafo_knn(k_vizinhos)
+    n_componentes, componentes = connected_components(conectividade, directed=False)
+
+    rotulos = np.empty(n, dtype=np.int64)
+    proximo = 0
+    for c in range(n_componentes):
+        idx = np.flatnonzero(componentes == c)
+        if len(idx) == 1:
+            rotulos[idx] = proximo
+            proximo += 1
+            continue
+
+        cluster = AgglomerativeClustering(
+            n_clusters=None,
+            distance_threshold=distancia,
+            metric="cosine",
+            linkage="average",
+            connectivity=conectividade[idx][:, idx],
+        )
+        ids = cluster.fit_predict(embeddings[idx])
+        rotulos[idx] = ids + proximo
+        proximo += ids.max() + 1
+
+    return rotulos
+
+
+def agrupar_sinonimos_semanticos(grupos_leven, distancia=1.0, esparso=None, k_vizinhos=15):
     """
     grupos_leven = resultado do Levenshtein:
       Ex:
@@ -135,6 +179,8 @@ def agrupar_sinonimos_semanticos(grupos_leven, distancia=1.0):
         }
 
     distancia = limiar para juntar sinônimos
+    esparso = usa o grafo kNN (k_vizinhos) em vez da matriz completa;
+              None escolhe sozinho pelo número de rótulos (LIMITE_DENSO)
     """
 
     # ------------------------------------------------------
@@ -150,19 +196,26 @@ def agrupar_sinonimos_semanticos(grupos_leven, distancia=1.0):
     todos_rotulos = sorted(todos_rotulos)
 
     # carregar embeddings
-    modelo = SentenceTransformer("paraphrase-multilingual-MiniLM-L12-v2")
-    embeddings = modelo.encode(todos_rotulos, convert_to_numpy=True, normalize_embeddings=True)
+    embeddings = cache_embeddings.codificar(
+        todos_rotulos, "paraphrase-multilingual-MiniLM-L12-v2", normalizar_embeddings=True
+    )
 
     # ------------------------------------------------------
     # 2. AGRUPAMENTO SEMÂNTICO
     # ------------------------------------------------------
-    cluster = AgglomerativeClustering(
-        n_clusters=None,
-        distance_threshold=distancia,
-        metric="cosine",
-        linkage="average"
-    )
-    grupos_ids = cluster.fit_predict(embeddings)
+    if esparso is None:
+        esparso = len(todos_rotulos) > LIMITE_DENSO
+
+    if esparso:
+        grupos_ids = rotular_esparso(embeddings, distancia, k_vizinhos)
+    else:
+        cluster = AgglomerativeClustering(
+            n_clusters=None,
+            distance_threshold=distancia,
+            metric="cosine",
+            linkage="average"
+        )
+        grupos_ids = cluster.fit_predict(embeddings)
 
     # ------------------------------------------------------
     # 3. MONTAR GRUPOS (SEM CHAVE PRINCIPAL)
@@ -4,6 +4,12 @@ from pathlib import Path
 import re
 import json
 
+import dados
+import medicao
+import normalizacao
+import cubo
+import dicionario_versionado
+
 # ------------------------------------------------------------
 # FUNÇÕES DE CARREGAMENTO DE DADOS
 # ------------------------------------------------------------
@@ -40,6 +46,10 @@ def carregar_json_upper(caminho):
 def normalizar_descricao(texto, sinonimos, universal):
     """
     Normaliza a descrição aplicando dicionário universal e sinônimos.
+    Versão linha a linha; para séries inteiras use normalizacao.Normalizador.
+    Os sinônimos são aplicados um a um na ordem do dicionário; o
+    Normalizador faz uma passada só e difere quando termos se sobrepõem
+    (ver a docstring dele).
     """
     if not isinstance(texto, str) or texto.strip() == "":
         return texto
@@ -72,53 +82,70 @@ def main():
     # ------------------------------
     # Carregar dicionários
     # ------------------------------
-    sinonimos = carregar_json_local("dicionarios/dict_sinonimo.json")
-    universal = carregar_json_upper("dicionarios/dict.json")
+    caminho_sinonimos = Path("dicionarios/dict_sinonimo.json")
+    caminho_universal = Path("dicionarios/dict.json")
+    # Os JSON são reescritos inteiros pela API Express; o dicionário
+    # versionado só relê um arquivo quando ele muda e guarda a diferença.
+    # Se um JSON estiver inválido, segue com a última versão lida.
+    with medicao.medir("Leitura dos dicionários"):
+        loja_sinonimos = dicionario_versionado.obter("dict_sinonimo")
+        loja_universal = dicionario_versionado.obter("dict")
+        for loja, caminho_json, maiusculas in (
+            (loja_sinonimos, caminho_sinonimos, False),
+            (loja_universal, caminho_universal, True),
+        ):
+            try:
+                loja.sincronizar_arquivo(caminho_json, maiusculas)
+            except Exception as e:
+                st.error(f"Erro ao ler {caminho_json}: {e}")
 
     # ------------------------------
     # Carregar CSV
     # ------------------------------
     caminho = Path("saida.csv")
+    # As contagens vêm do cubo agregado (células, não linhas); um arquivo
+    # enviado é agregado na hora.
     arquivo = st.file_uploader("Enviar CSV", type=["csv"])
-    if arquivo:
-        df = pd.read_csv(arquivo, sep=";")
-    elif caminho.exists():
-        df = pd.read_csv(caminho, sep=";")
-    else:
-        st.error("Nenhum CSV encontrado.")
-        st.stop()
+    with medicao.medir("Cubo de contagens"):
+        if arquivo:
+            cubo_df = cubo.agregar(pd.read_csv(arquivo, sep=";"))
+        elif dados.usa_banco() or caminho.exists():
+            cubo_df = cubo.obter_cubo_saida()
+        else:
+            st.error("Nenhum CSV encontrado.")
+            st.stop()
 
     # ------------------------------
     # Normalizar descrições
     # ------------------------------
-    df["DescricaoManutencao"] = df["DescricaoManutencao"].astype(str)
-    df["DescricaoNormalizada"] = df["DescricaoManutencao"].apply(
-        lambda x: normalizar_descricao(x, sinonimos, universal)
-    )
+    # Resultado por descrição guardado entre reruns; quando um termo dos
+    # dicionários muda, só as descrições que dependem dele são refeitas
+    # e o ranking é corrigido pela diferença.
+    if arquivo:
+        chave = ("upload", arquivo.file_id)
+    else:
+        chave = ("saida", dados.origem_saida(), dados.versao_saida())
+    with medicao.medir("Normalização"):
+        incremental = normalizacao.obter_incremental(
+            chave, lambda: cubo.registros_por_descricao(cubo_df), loja_sinonimos, loja_universal
+        )
+        por_descricao, ranking = incremental.tabelas()
 
     # ------------------------------
     # Tarefas únicas + contagem ORIGINAL
     # ------------------------------
     st.subheader("🧾 Tarefas Únicas + Contagem Original")
-    df_contagem_original = (
-        df.groupby(["DescricaoManutencao", "DescricaoNormalizada"])
-        .size()
-        .reset_index(name="QuantidadeOriginal")
-        .sort_values(by="QuantidadeOriginal", ascending=False)
-    )
+    with medicao.medir("Contagem original"):
+        df_contagem_original = por_descricao.rename(columns={"registros": "QuantidadeOriginal"})
     st.dataframe(df_contagem_original, use_container_width=True)
 
     # ------------------------------
     # Contagem FINAL normalizada
     # ------------------------------
     st.subheader("🏆 Ranking de Tarefas (Normalizadas)")
-    contagem_final = (
-        df["DescricaoNormalizada"]
-        .value_counts()
-        .reset_index()
-        .rename(columns={"index": "Tarefa Normalizada", "DescricaoNormalizada": "Quantidade"})
-    )
-    contagem_final.columns = ["Tarefa Normalizada", "Quantidade"]
+    with medicao.medir("Ranking normalizado"):
+        contagem_final = ranking.reset_index()
+        contagem_final.columns = ["Tarefa Normalizada", "Quantidade"]
     st.dataframe(contagem_final, use_container_width=True)
 
 
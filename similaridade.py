@@ -0,0 +1,123 @@
+import re
+
+import numpy as np
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-zA-Z0-9\s]')
+
+
+# ------------------------------------------------------------
+# Limpeza (feita uma única vez por texto)
+# ------------------------------------------------------------
+def limpar(texto):
+    """Mesma limpeza usada historicamente pela distancia_levenshtein."""
+    return _NAO_ALFANUMERICO.sub('', texto).strip().lower()
+
+
+def limpar_lote(textos):
+    return [limpar(t) for t in textos]
+
+
+# ------------------------------------------------------------
+# API em lote
+# ------------------------------------------------------------
+def distancia(a, b, max_dist=None):
+    """
+    Distância de Levenshtein entre dois textos já limpos.
+    Com max_dist, o cálculo para cedo e retorna max_dist + 1.
+    """
+    return Levenshtein.distance(a, b, score_cutoff=max_dist)
+
+
+def distancias(consulta, candidatos, max_dist=None, workers=-1):
+    """Uma consulta contra vários candidatos (textos já limpos)."""
+    return matriz_distancias([consulta], candidatos, max_dist, workers)[0]
+
+
+def matriz_distancias(consultas, candidatos, max_dist=None, workers=-1):
+    """
+    Várias consultas contra vários candidatos, em paralelo em todos os
+    núcleos (workers=-1). Valores acima de max_dist saem como max_dist + 1.
+    """
+    if len(consultas) == 0 or len(candidatos) == 0:
+        return np.zeros((len(consultas), len(candidatos)), dtype=np.int32)
+
+    return process.cdist(
+        consultas,
+        candidatos,
+        scorer=Levenshtein.distance,
+        score_cutoff=max_dist,
+        dtype=np.int32,
+        workers=workers,
+    )
+
+
+# ------------------------------------------------------------
+# Agrupamento guloso (mesma semântica dos loops originais)
+# ------------------------------------------------------------
+def agrupar_guloso(chaves, max_dist, rotulos=None, fim_bloco=None,
+                   workers=-1, tamanho_lote=256, progresso=None):
+    """
+    Agrupa os itens na ordem dada: cada item ainda não visitado abre um grupo
+    e absorve os itens seguintes (até fim_bloco[i], exclusivo) não visitados
+    cuja distância até ele seja <= max_dist.
+
+    - chaves: textos já limpos usados na comparação
+    - rotulos: identidade usada no conjunto de visitados (padrão: a chave)
+    - fim_bloco: limite superior de comparação para cada item (padrão: n)
+    - tamanho_lote: itens ainda não visitados comparados por chamada ao cdist
+    - progresso: callback(feitos, total) chamado a cada lote
+
+    Retorna a lista de grupos (listas de índices), incluindo os unitários.
+    """
+    total = len(chaves)
+    if rotulos is None:
+        rotulos = chaves
+    if fim_bloco is None:
+        fim_bloco = [total] * total
+
+    grupos = []
+    visitadas = set()
+
+    proximo = 0
+    while proximo < total:
+        # Lote: os próximos itens ainda não visitados (os absorvidos por
+        # grupos anteriores não entram na matriz, nem como consulta nem
+        # como candidato)
+        lote = []
+        while proximo < total and len(lote) < tamanho_lote:
+            if rotulos[proximo] not in visitadas:
+                lote.append(proximo)
+            proximo += 1
+        if not lote:
+            break
+        limite = max(fim_bloco[i] for i in lote)
+        candidatos = np.array(
+            [j for j in range(lote[0] + 1, limite) if rotulos[j] not in visitadas], dtype=np.int64
+        )
+
+        # Distâncias do lote inteiro calculadas de uma vez, em paralelo
+        matriz = matriz_distancias(
+            [chaves[i] for i in lote], [chaves[j] for j in candidatos], max_dist, workers
+        )
+
+        for linha, i in zip(matriz, lote):
+            if rotulos[i] in visitadas:
+                continue
+            visitadas.add(rotulos[i])
+            grupo = [i]
+
+            # Candidatos em ordem crescente: só os depois de i e antes do fim do bloco
+            de, ate = np.searchsorted(candidatos, [i + 1, fim_bloco[i]])
+            for j in candidatos[de:ate][linha[de:ate] <= max_dist]:
+                if rotulos[j] not in visitadas:
+                    visitadas.add(rotulos[j])
+                    grupo.append(int(j))
+
+            grupos.append(grupo)
+
+        if progresso is not None:
+            progresso(proximo, total)
+
+    return grupos
@@ -9,15 +9,15 @@ import re
 import json
 import streamlit.components.v1 as components
 import estado_global  # módulo para guardar variáveis globais
-from sentence_transformers import SentenceTransformer
-import hdbscan
-import umap
+from dados import carregar_saida, usa_banco
+import similaridade
+import cache_embeddings
+import clusters_incrementais
+import medicao
 import numpy as np
 import pandas as pd
 import re
 import unidecode
-from rapidfuzz.distance import Levenshtein
-from nltk.stem.snowball import SnowballStemmer
 
 
 def extrair_primeiras(frase):
@@ -58,27 +58,23 @@ def receber_dict_js(dicionario):
         except:
             st.error("Erro ao converter o dicionário recebido do JavaScript.")
             return
-    estado_global.DICIONARIO_UNIVERSAL = dicionario
-    st.success("✅ DICIONARIO_UNIVERSAL atualizado com sucesso!")
-    st.json(estado_global.DICIONARIO_UNIVERSAL)
+    if not isinstance(dicionario, dict):
+        st.error("O dicionário recebido do JavaScript não é um objeto JSON.")
+        return
+    # Grava só a diferença no armazenamento compartilhado entre os workers
+    alteradas, removidas = estado_global.DICIONARIO_UNIVERSAL.substituir(dicionario)
+    st.success(
+        f"✅ DICIONARIO_UNIVERSAL atualizado com sucesso! "
+        f"({alteradas} chaves novas/alteradas, {removidas} removidas)"
+    )
+    st.json(estado_global.DICIONARIO_UNIVERSAL.copia())
 
 
 # ------------------------------------------------------------
 # Distância de Levenshtein
 # ------------------------------------------------------------
 def distancia_levenshtein(a, b):
-    a = re.sub(r'[^a-zA-Z0-9\s]', '', a).strip().lower()
-    b = re.sub(r'[^a-zA-Z0-9\s]', '', b).strip().lower()
-    if len(a) == 0: return len(b)
-    if len(b) == 0: return len(a)
-    dp = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
-    for i in range(len(a) + 1): dp[i][0] = i
-    for j in range(len(b) + 1): dp[0][j] = j
-    for i in range(1, len(a) + 1):
-        for j in range(1, len(b) + 1):
-            custo = 0 if a[i-1] == b[j-1] else 1
-            dp[i][j] = min(dp[i-1][j]+1, dp[i][j-1]+1, dp[i-1][j-1]+custo)
-    return dp[-1][-1]
+    return similaridade.distancia(similaridade.limpar(a), similaridade.limpar(b))
 
 
 # ------------------------------------------------------------
@@ -113,14 +109,15 @@ def main():
     st.title("🔤 Agrupamento Inteligente de Tarefas (765 frases)")
 
     caminho = Path("saida.csv")
-    if not caminho.exists():
+    if not (usa_banco() or caminho.exists()):
         st.error("Arquivo 'saida.csv' não encontrado.")
         return
 
     # ---------------------------------------------------------
     # 1. CARREGA CSV
     # ---------------------------------------------------------
-    df = pd.read_csv(caminho, sep=";")
+    with medicao.medir("Leitura do CSV"):
+        df = carregar_saida()
     df["DescricaoManutencao"] = df["DescricaoManutencao"].astype(str).str.strip()
     df = df[df["DescricaoManutencao"] != ""]
 
@@ -133,8 +130,9 @@ def main():
         texto = re.sub(r"\s+", " ", texto).strip()
         return texto
 
-    frases = df["DescricaoManutencao"].apply(normalizar_frase).tolist()
-    frases_unicas = sorted(set(frases))
+    with medicao.medir("Normalização"):
+        frases = df["DescricaoManutencao"].apply(normalizar_frase).tolist()
+        frases_unicas = sorted(set(frases))
 
     st.subheader("📌 Total de frases após normalização")
     st.write(f"Total: **{len(frases_unicas)}** frases únicas")
@@ -143,31 +141,27 @@ def main():
     # 3. EMBEDDING COM FRASE COMPLETA
     # ---------------------------------------------------------
     st.write("🔍 Gerando embeddings...")
-    modelo = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-    emb = modelo.encode(frases_unicas, show_progress_bar=True)
+    modelo_embeddings = "sentence-transformers/all-mpnet-base-v2"
+    with medicao.medir("Embeddings", frases=len(frases_unicas)):
+        emb = cache_embeddings.codificar(frases_unicas, modelo_embeddings, show_progress_bar=True)
 
     # ---------------------------------------------------------
-    # 4. UMAP PARA REDUÇÃO DE DIMENSÃO
+    # 4/5. UMAP + HDBSCAN (reaproveita o ajuste salvo)
     # ---------------------------------------------------------
-    st.write("🔧 Reduzindo dimensionalidade...")
-    umap_emb = umap.UMAP(
-        n_neighbors=15,
-        min_dist=0.0,
-        n_components=5,
-        metric='cosine'
-    ).fit_transform(emb)
+    # Frases novas entram nos clusters existentes via transform /
+    # approximate_predict; o reajuste completo só acontece sob pedido
+    # ou quando a deriva passa dos limites.
+    reajustar = st.checkbox("♻️ Reajustar UMAP/HDBSCAN do zero", value=False)
 
-    # ---------------------------------------------------------
-    # 5. AGRUPAMENTO COM HDBSCAN
-    # ---------------------------------------------------------
     st.write("📊 Agrupando frases...")
-    clusterer = hdbscan.HDBSCAN(
-        min_cluster_size=3,
-        min_samples=1,
-        metric='euclidean'
-    )
-
-    labels = clusterer.fit_predict(umap_emb)
+    with medicao.medir("Clusters"):
+        labels, relatorio = clusters_incrementais.agrupar(
+            frases_unicas, emb, "sinonimos", modelo_embeddings, forcar=reajustar
+        )
+    if relatorio["reajuste"]:
+        st.caption(f"Modelo reajustado ({relatorio['motivo']}).")
+    else:
+        st.caption(f"Modelo reaproveitado; {relatorio['novas']} frases novas atribuídas.")
 
     # ---------------------------------------------------------
     # 6. MONTA GRUPOS
@@ -217,31 +211,26 @@ def main():
 
     resultados_finais = []
     grupos_para_export = []
-    visitadas = set()
-    total = len(dados)
-
-    for i in range(total):
-        p1, id1 = dados[i]
-        key1 = get_key(p1)
-        if p1 in visitadas: continue
-        visitadas.add(p1)
-        grupo_atual = [(p1, id1)]
-        for j in range(i + 1, total):
-            p2, id2 = dados[j]
-            key2 = get_key(p2)
-            if p2 not in visitadas:
-                dist = distancia_levenshtein(key1, key2)
-                if dist <= max_dist:
-                    visitadas.add(p2)
-                    grupo_atual.append((p2, id2))
+
+    descricoes = [p for p, _ in dados]
+    with medicao.medir("Agrupamento Levenshtein", descricoes=len(descricoes)):
+        grupos = similaridade.agrupar_guloso(
+            similaridade.limpar_lote([get_key(p) for p in descricoes]),
+            max_dist,
+            rotulos=descricoes,
+            progresso=lambda feitos, total: progress_bar.progress(feitos / total),
+        )
+
+    for indices in grupos:
+        grupo_atual = [tuple(dados[k]) for k in indices]
         if len(grupo_atual) > 1:
             grupos_para_export.append(grupo_atual)
             resultados_finais.append("---")
             for desc, ident in grupo_atual:
                 resultados_finais.append(f"[{ident}] {desc}\n")
             resultados_finais.append("---")
-            placeholder.markdown("\n".join(resultados_finais))
-        progress_bar.progress((i + 1)/total)
+
+    placeholder.markdown("\n".join(resultados_finais))
 
     progress_bar.empty()
 
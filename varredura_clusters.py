@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import time
+
+import numpy as np
+
+import cache_embeddings
+from dados import DIRETORIO_CACHE, carregar_csv
+
+DIRETORIO_VARREDURA = DIRETORIO_CACHE / "varredura"
+MODELO_PADRAO = "sentence-transformers/all-mpnet-base-v2"
+
+_REDUCOES = {}
+
+
+# ------------------------------------------------------------
+# Entrada: mesmas frases que sinonimos.main agrupa
+# ------------------------------------------------------------
+def normalizar_frase(texto):
+    import unidecode
+
+    texto = unidecode.unidecode(texto.lower())
+    texto = re.sub(r"[^a-z0-9\s]", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def frases_do_csv(caminho="saida.csv", coluna="DescricaoManutencao"):
+    df = carregar_csv(caminho, sep=";")
+    textos = df[coluna].astype(str).str.strip()
+    return sorted({normalizar_frase(t) for t in textos if t})
+
+
+def _hash(*partes):
+    conteudo = json.dumps(partes, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+# ------------------------------------------------------------
+# Etapas com cache pela entrada
+# ------------------------------------------------------------
+def reduzir(embeddings, chave_entrada, n_neighbors, min_dist=0.0, n_components=5):
+    """
+    UMAP das embeddings, guardado em .cache/varredura/umap-<hash>.npy. A
+    chave é (conteúdo da entrada, parâmetros); devolve (matriz, segundos,
+    veio_do_cache).
+    """
+    chave = _hash(chave_entrada, n_neighbors, min_dist, n_components)
+    if chave in _REDUCOES:
+        return _REDUCOES[chave], 0.0, True
+
+    arquivo = DIRETORIO_VARREDURA / f"umap-{chave}.npy"
+    if arquivo.exists():
+        reduzido = _REDUCOES[chave] = np.load(arquivo)
+        return reduzido, 0.0, True
+
+    import umap
+
+    inicio = time.perf_counter()
+    reduzido = umap.UMAP(
+        n_neighbors=n_neighbors,
+        min_dist=min_dist,
+        n_components=n_components,
+        metric="cosine",
+    ).fit_transform(embeddings)
+    segundos = time.perf_counter() - inicio
+
+    DIRETORIO_VARREDURA.mkdir(parents=True, exist_ok=True)
+    np.save(arquivo, reduzido)
+    _REDUCOES[chave] = reduzido
+    return reduzido, segundos, False
+
+
+def agrupar(reduzido, min_cluster_size, min_samples, memoria):
+    """
+    HDBSCAN com memory=joblib.Memory: a árvore (MST / single linkage) só
+    depende de (dados, min_samples), então variar min_cluster_size reusa
+    a árvore e refaz apenas a condensação e a seleção dos clusters.
+    """
+    import hdbscan
+
+    inicio = time.perf_counter()
+    rotulos = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size,
+        min_samples=min_samples,
+        metric="euclidean",
+        memory=memoria,
+    ).fit_predict(reduzido)
+    return rotulos, time.perf_counter() - inicio
+
+
+# ------------------------------------------------------------
+# Varredura da grade
+# ------------------------------------------------------------
+def varrer(
+    frases,
+    n_neighbors=(10, 15, 30),
+    min_samples=(1, 3),
+    min_cluster_size=(2, 3, 5, 10),
+    modelo_nome=MODELO_PADRAO,
+):
+    """
+    Roda a grade inteira e devolve uma linha por combinação com o número
+    de clusters, a fração de ruído e o tempo de cada etapa.
+    """
+    from joblib import Memory
+
+    inicio = time.perf_counter()
+    embeddings = cache_embeddings.codificar(frases, modelo_nome)
+    t_embeddings = time.perf_counter() - inicio
+    chave_entrada = _hash(modelo_nome, list(frases))
+
+    memoria = Memory(DIRETORIO_VARREDURA / "hdbscan", verbose=0)
+    linhas = []
+    for vizinhos in n_neighbors:
+        reduzido, t_umap, umap_cache = reduzir(embeddings, chave_entrada, vizinhos)
+
+        for amostras, tamanho in itertools.product(min_samples, min_cluster_size):
+            rotulos, t_hdbscan = agrupar(reduzido, tamanho, amostras, memoria)
+            linhas.append({
+                "n_neighbors": vizinhos,
+                "min_samples": amostras,
+                "min_cluster_size": tamanho,
+                "clusters": int(rotulos.max() + 1),
+                "ruido": round(float(np.mean(rotulos == -1)), 4),
+                "t_embeddings": round(t_embeddings, 3),
+                "t_umap": round(t_umap, 3),
+                "umap_cache": umap_cache,
+                "t_hdbscan": round(t_hdbscan, 3),
+            })
+            # Embeddings e UMAP são contados só na primeira linha que os usou
+            t_embeddings = t_umap = 0.0
+            umap_cache = True
+    return linhas
+
+
+def imprimir_tabela(linhas):
+    colunas = list(linhas[0])
+    print("  ".join(f"{c:>16}" for c in colunas))
+    for linha in linhas:
+        print("  ".join(f"{str(linha[c]):>16}" for c in colunas))
+
+
+# ------------------------------------------------------------
+# Linha de comando
+# ------------------------------------------------------------
+def _inteiros(texto):
+    return [int(x) for x in texto.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros UMAP/HDBSCAN")
+    parser.add_argument("--csv", default="saida.csv")
+    parser.add_argument("--coluna", default="DescricaoManutencao")
+    parser.add_argument("--modelo", default=MODELO_PADRAO)
+    parser.add_argument("--n-neighbors", type=_inteiros, default=[10, 15, 30])
+    parser.add_argument("--min-samples", type=_inteiros, default=[1, 3])
+    parser.add_argument("--min-cluster-size", type=_inteiros, default=[2, 3, 5, 10])
+    parser.add_argument("--saida", help="Grava o resultado em JSON lines")
+    args = parser.parse_args()
+
+    frases = frases_do_csv(args.csv, args.coluna)
+    print(f"{len(frases)} frases únicas")
+
+    linhas = varrer(frases, args.n_neighbors, args.min_samples, args.min_cluster_size, args.modelo)
+    imprimir_tabela(linhas)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            for linha in linhas:
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")